@@ -19,7 +19,9 @@ def parseInputs():
   first_bot = bot_options[0]
   parser.add_argument("--enemy", help="Name of the adversary AI. Options are: " + line, default = first_bot)
   parser.add_argument("--n", help="Budget given to the bots. Corresponds to the number of playouts they do before taking a move", default = 500)
+  parser.add_argument("--time_ms", help="Time given to the bots for each move, in milliseconds. If given, it replaces the budget n", default = None)
   parser.add_argument("--play_as", help="Side you want to play. Options are red or blue", default = "red")
+  parser.add_argument("--engine", help="Game engine. Options are " + ', '.join(GAME.engines.keys()), default = "bitboard")
   parser.add_argument("--console_debug", help="Set to true to print on the console the different events. Used to debug and follow game logic", default = "false")
   args = parser.parse_args()
   return args
@@ -262,6 +264,8 @@ def main(**kwargs):
     enemy_name = kwargs['enemy_name']
     human = kwargs['play_as']
     console_debug = kwargs["console_debug"]
+    board_class = kwargs.get("board_class", GAME.BitBoard)
+    time_ms = kwargs.get("time_ms", None)
    
     # Start pygame    
     p.init()
@@ -327,7 +331,7 @@ def main(**kwargs):
     
     
     # Start game    
-    gs = GAME.Board()
+    gs = board_class()
     clock = p.time.Clock()
     first_piece_selected = None
     card_selected = None
@@ -379,7 +383,7 @@ def main(**kwargs):
                   
                   # Player clicked on a shrine, must reset game to start over
                   if block_game==False:
-                    gs = GAME.Board()                  
+                    gs = board_class()
                     first_piece_selected = None
                     card_selected = None
                     restart_board_colors(board_cells)
@@ -502,8 +506,11 @@ def main(**kwargs):
                 screen.blit(label, (pos, HEIGHT//2))
                 p.display.update()
                 T = transposition_table.T_Table() 
-                # TODO: For the moment all bots recieve Table, board, n
-                move = enemy(T, gs, nb_coups)
+                # TODO: For the moment all bots recieve Table, board, n, time_ms
+                if time_ms is None:
+                  move = enemy(T, gs, nb_coups)
+                else:
+                  move = enemy(T, gs, time_ms = time_ms)
                 gs.play (move)
                 board_cells[move.x1][move.y1].fill(color_selected)
                 board_cells[move.x2][move.y2].fill(color_highlight)
@@ -549,7 +556,9 @@ if __name__ == "__main__":
     n = int(args.n)
     play_as = GAME.White if args.play_as.lower() == "red" else GAME.Black
     console_debug = True if args.console_debug.lower() == "true" else False
-    main(nb_coups = n, enemy = enemy, play_as = play_as, enemy_name = enemy_name, console_debug=console_debug)
+    board_class = GAME.engines[args.engine]
+    time_ms = None if args.time_ms is None else float(args.time_ms)
+    main(nb_coups = n, enemy = enemy, play_as = play_as, enemy_name = enemy_name, console_debug=console_debug, board_class = board_class, time_ms = time_ms)
   
   
     
\ No newline at end of file
@@ -27,9 +27,19 @@ transposition_table.T_Table.MaxTotalLegalMoves = 2 * GAME.Dx * GAME.Dy * GAME.ON
 transposition_table.T_Table.White = GAME.White
 transposition_table.T_Table.Black = GAME.Black
 
-def main_bot_vs_bot_console(bot1 = PLAYERS.UCB, bot2 = PLAYERS.flat, bot1_kwargs ={}, bot2_kwargs ={}, time_sleep = 1):
+def new_or_pruned_table(Table, board, reuse_tree):
+    '''
+    Table for the next move of a bot: the one of its previous move, pruned to the new position, if reuse_tree is True
+    '''
+    if Table is None or not reuse_tree:
+        return transposition_table.T_Table()
+    Table.prune(board)
+    return Table
+
+def main_bot_vs_bot_console(bot1 = PLAYERS.UCB, bot2 = PLAYERS.flat, bot1_kwargs ={}, bot2_kwargs ={}, time_sleep = 1, board_class = GAME.BitBoard, reuse_tree = False):
     
-    gs = GAME.Board()
+    gs = board_class()
+    bot1_kwargs['Table'], bot2_kwargs['Table'] = None, None
     running = True
     while running:        
         if gs.terminal():
@@ -42,7 +52,7 @@ def main_bot_vs_bot_console(bot1 = PLAYERS.UCB, bot2 = PLAYERS.flat, bot1_kwargs
                 """
                 UCB joue blanc
                 """
-                bot1_kwargs['Table'] = transposition_table.T_Table()
+                bot1_kwargs['Table'] = new_or_pruned_table(bot1_kwargs['Table'], gs, reuse_tree)
                 bot1_kwargs['board'] = gs 
                 move = bot1(**bot1_kwargs)
                 gs.play(move)
@@ -55,7 +65,7 @@ def main_bot_vs_bot_console(bot1 = PLAYERS.UCB, bot2 = PLAYERS.flat, bot1_kwargs
                 Flat joue noir
                 """
                 # gs.play_random ()
-                bot2_kwargs['Table'] = transposition_table.T_Table()
+                bot2_kwargs['Table'] = new_or_pruned_table(bot2_kwargs['Table'], gs, reuse_tree)
                 bot2_kwargs['board'] = gs
                 move = bot2(**bot2_kwargs)
                 gs.play(move)                
@@ -88,8 +98,8 @@ def print_cards(gs):
 """
 Main pour joueur à la main contre un programme en utilisant la console
 """
-def main_console(player = PLAYERS.UCB, nb_steps = 100, **kwargs):
-    gs = GAME.Board()
+def main_console(player = PLAYERS.UCB, nb_steps = 100, board_class = GAME.BitBoard, **kwargs):
+    gs = board_class()
     while not gs.terminal():
         if gs.turn == White:
             # Show cards
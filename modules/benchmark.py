@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+"""
+Speed measurements for the game engines and the bots.
+Run from the modules folder: python benchmark.py --help
+"""
+
+import onitama as GAME
+import transposition_table as T
+import numpy as np
+import random
+import time
+from copy import deepcopy
+from argparse import ArgumentParser, ArgumentDefaultsHelpFormatter
+
+
+def parseInputs():
+  parser = ArgumentParser(formatter_class=ArgumentDefaultsHelpFormatter)
+  engine_options = ', '.join(GAME.engines.keys())
+  parser.add_argument("--engines", help=f"Comma separated list of engines to measure. Options are {engine_options}", default=','.join(GAME.engines.keys()))
+  parser.add_argument("--seconds", help="Time spent measuring each engine", default=3)
+  parser.add_argument("--batch", help="Number of games played together when measuring the batch playouts. 0 to skip them", default=1000)
+  parser.add_argument("--lookups", help="Number of positions stored when measuring the transposition table lookups. 0 to skip them", default=20000)
+  parser.add_argument("--seed", help="Seed used for the card draw and the playouts", default=0)
+  args = parser.parse_args()
+  return args
+
+
+def playouts_per_second(board_class, seconds, seed = 0):
+  '''
+  Random playouts from the initial position during 'seconds'
+  '''
+  np.random.seed(seed)
+  random.seed(seed)
+  board = board_class()
+  done = 0
+  start = time.perf_counter()
+  while time.perf_counter() - start < seconds:
+    b = deepcopy(board)
+    b.playout()
+    done += 1
+  return done / (time.perf_counter() - start)
+
+
+def batch_playouts_per_second(board_class, seconds, n, seed = 0):
+  '''
+  Random playouts from the initial position during 'seconds', n at a time with Board.batchPlayout
+  '''
+  np.random.seed(seed)
+  board = board_class()
+  done = 0
+  start = time.perf_counter()
+  while time.perf_counter() - start < seconds:
+    board.batchPlayout(n)
+    done += n
+  return done / (time.perf_counter() - start)
+
+
+class Position(object):
+  '''
+  Stands for a board in the lookups, which only read its hash
+  '''
+  def __init__(self, h, moves):
+    self.h = h
+    self.moves = moves
+
+  def legalMoves(self):
+    return self.moves
+
+
+def random_positions(n, seed = 0):
+  '''
+  Hashes and moves of n different positions met in random games
+  '''
+  np.random.seed(seed)
+  random.seed(seed)
+  positions = {}
+  while len(positions) < n:
+    board = GAME.BitBoard()
+    while not board.terminal() and len(positions) < n:
+      positions[board.h] = Position(board.h, board.legalMoves())
+      board.play_random()
+  return list(positions.values())
+
+
+def lookups_per_second(table, positions, seconds):
+  '''
+  Lookups of the positions, all stored in table beforehand, during 'seconds'
+  '''
+  for p in positions:
+    table.add(p)
+  done = 0
+  start = time.perf_counter()
+  while time.perf_counter() - start < seconds:
+    for p in positions:
+      table.look(p)
+    done += len(positions)
+  return done / (time.perf_counter() - start)
+
+
+def set_table_constants():
+  T.T_Table.MaxLegalMoves = GAME.MaxLegalMoves
+  T.T_Table.MaxTotalLegalMoves = GAME.MaxTotalLegalMoves
+  T.T_Table.White = GAME.White
+  T.T_Table.Black = GAME.Black
+
+
+if __name__ == "__main__":
+  args = parseInputs()
+  for name in args.engines.split(','):
+    speed = playouts_per_second(GAME.engines[name], float(args.seconds), int(args.seed))
+    print("{:<10} {:>10.1f} playouts/s".format(name, speed))
+  if int(args.batch) > 0:
+    speed = batch_playouts_per_second(GAME.BitBoard, float(args.seconds), int(args.batch), int(args.seed))
+    print("{:<10} {:>10.1f} playouts/s".format("batch", speed))
+  if int(args.lookups) > 0:
+    set_table_constants()
+    positions = random_positions(int(args.lookups), int(args.seed))
+    # The same positions keyed only by their 64-bit key, as the tables did before storing the check bits
+    unchecked = [Position(p.h & T.KEY_MASK, p.moves) for p in positions]
+    tables = [("dict 64-bit", T.T_Table(), unchecked),
+              ("dict checked", T.T_Table(), positions),
+              ("fixed checked", T.FixedTable(2 * len(positions)), positions)]
+    for name, table, stored in tables:
+      speed = lookups_per_second(table, stored, float(args.seconds))
+      print("{:<14} {:>10.1f} lookups/s, {} bytes".format(name, speed, table.nbytes()))
@@ -0,0 +1,178 @@
+# -*- coding: utf-8 -*-
+"""
+Game records in a compact binary format: the cards of each game and the Move.code of its moves, 2 bytes per move.
+A shard file is a header followed by one record per game, so games can be appended while it is read.
+Run from the modules folder to look at a shard: python game_records.py --help
+"""
+
+import os
+import numpy as np
+import onitama as GAME
+from argparse import ArgumentParser, ArgumentDefaultsHelpFormatter
+
+RECORDS_MAGIC = b'ONIGAMES'
+RECORDS_VERSION = 1
+# Magic, version and a free uint32
+HEADER_BYTES = 16
+# Words of a record before its moves: number of moves, four cards, fifth card and result
+RECORD_HEADER = 3
+CARD_NAMES = list(GAME.cards.keys())
+# Result word of a game without a winner
+NO_RESULT = 2
+
+
+def _header():
+    return RECORDS_MAGIC + np.array([RECORDS_VERSION, 0], dtype = '<u4').tobytes()
+
+
+def pack(cards, moves, result):
+    '''
+    Little-endian uint16 words of a game: [number of moves, cards 0 to 3 in 4 bits each, card 4 + 16 * result, move codes].
+    cards are the names in the order of Board.chosen_cards, result is 1 if White won, 0 if Black won, anything else if neither did
+    '''
+    if len(moves) >= 2**16:
+        raise Exception(f"A game record holds at most {2**16 - 1} moves, got {len(moves)}")
+    c = [CARD_NAMES.index(name) for name in cards]
+    outcome = int(result) if result in (0, 1) else NO_RESULT
+    words = [len(moves), c[0] | c[1] << 4 | c[2] << 8 | c[3] << 12, c[4] | outcome << 4]
+    return np.array(words + list(moves), dtype = '<u2').tobytes()
+
+
+class Game(object):
+    '''
+    One game of a shard: cards in the order of Board.chosen_cards, result (1.0, 0.0 or None) and array of the move codes
+    '''
+    def __init__(self, cards, result, moves):
+        self.cards = cards
+        self.result = result
+        self.moves = moves
+
+    def board(self, board_class = GAME.BitBoard):
+        return board_class(self.cards)
+
+    def replay(self, board_class = GAME.BitBoard):
+        '''
+        Yields the board before each move and the move, then the final board and None.
+        It is the same board each time, played on between two steps: copy it to keep a position
+        '''
+        board = self.board(board_class)
+        for code in self.moves:
+            move = GAME.Move.from_code(int(code), board)
+            yield board, move
+            board.play(move)
+        yield board, None
+
+    def position(self, ply, board_class = GAME.BitBoard):
+        '''
+        Board after the first ply moves
+        '''
+        board = self.board(board_class)
+        for code in self.moves[:ply]:
+            board.play(GAME.Move.from_code(int(code), board))
+        return board
+
+    def __len__(self):
+        return len(self.moves)
+
+    def __repr__(self):
+        result = {1.0: 'White won', 0.0: 'Black won', None: 'no result'}[self.result]
+        return "{} moves, {}, cards {}".format(len(self.moves), result, ', '.join(self.cards))
+
+
+class GameWriter(object):
+    '''
+    Appends games to a shard file. Each game is flushed, and a record cut by the end of a previous run is dropped on opening
+    '''
+    def __init__(self, path):
+        self.path = path
+        if os.path.exists(path) and os.path.getsize(path) > 0:
+            end = GameReader(path).end
+            self.file = open(path, 'r+b')
+            self.file.truncate(end)
+            self.file.seek(end)
+        else:
+            self.file = open(path, 'wb')
+            self.file.write(_header())
+            self.file.flush()
+
+    def write(self, cards, moves, result):
+        self.file.write(pack(cards, moves, result))
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class GameReader(object):
+    '''
+    Games of a shard file, memory-mapped. The offsets of the records are found once, when opening it,
+    and the games are decoded only when asked for: reader[k], or iterating on the reader.
+    Games appended after opening are not seen
+    '''
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            header = f.read(HEADER_BYTES)
+        if len(header) < HEADER_BYTES or header[:8] != RECORDS_MAGIC:
+            raise Exception(f"{path} is not a game records file")
+        version = int(np.frombuffer(header[8:12], dtype = '<u4')[0])
+        if version != RECORDS_VERSION:
+            raise Exception(f"{path} has version {version} of the game records, expected {RECORDS_VERSION}")
+        words = (os.path.getsize(path) - HEADER_BYTES) // 2
+        self.words = np.memmap(path, dtype = '<u2', mode = 'r', offset = HEADER_BYTES, shape = (words,)) if words > 0 else np.zeros(0, dtype = '<u2')
+        # Start of each record, in words. A record cut by the end of the file is left out
+        lengths = self.words
+        starts = []
+        k = 0
+        while k < words and k + RECORD_HEADER + int(lengths[k]) <= words:
+            starts += [k]
+            k += RECORD_HEADER + int(lengths[k])
+        self.starts = np.array(starts, dtype = np.int64)
+        # Byte offset of the end of the last full record
+        self.end = HEADER_BYTES + 2 * k
+
+    def __len__(self):
+        return len(self.starts)
+
+    def __getitem__(self, k):
+        start = int(self.starts[k])
+        n, c, last = (int(w) for w in self.words[start:start + RECORD_HEADER])
+        cards = [CARD_NAMES[(c >> shift) & 15] for shift in (0, 4, 8, 12)] + [CARD_NAMES[last & 15]]
+        outcome = last >> 4
+        result = None if outcome == NO_RESULT else float(outcome)
+        return Game(cards, result, self.words[start + RECORD_HEADER:start + RECORD_HEADER + n])
+
+    def __iter__(self):
+        for k in range(len(self)):
+            yield self[k]
+
+    def moves(self):
+        '''
+        Number of moves of each game
+        '''
+        return self.words[self.starts].astype(np.int64) if len(self) > 0 else np.zeros(0, dtype = np.int64)
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(formatter_class=ArgumentDefaultsHelpFormatter)
+    parser.add_argument("records", help="Game records file, as written by tournament.py --records true")
+    parser.add_argument("--show", help="Number of a game to replay on the console", default=None)
+    args = parser.parse_args()
+    reader = GameReader(args.records)
+    moves = reader.moves()
+    results = [reader[k].result for k in range(len(reader))]
+    print("{} games, {} moves, {:.1f} moves per game, {} won by White, {} by Black".format(
+          len(reader), moves.sum(), moves.mean() if len(reader) > 0 else 0.0, results.count(1.0), results.count(0.0)))
+    if not args.show is None:
+        game = reader[int(args.show)]
+        print(game)
+        for board, move in game.replay():
+            print(board)
+            if not move is None:
+                print(move)
@@ -0,0 +1,166 @@
+# -*- coding: utf-8 -*-
+"""
+Queue of tournament games in a SQLite file, to play them on several machines.
+tournament.py --queue <file> hands out the games and applies their results in order.
+Workers pull games from the same file, on any machine that can reach it: python job_queue.py --queue <file>
+"""
+
+import json
+import os
+import socket
+import sqlite3
+import time
+import traceback
+from collections import deque
+import numpy as np
+import onitama as GAME
+from argparse import ArgumentParser, ArgumentDefaultsHelpFormatter
+
+
+def _json(x):
+    # NumPy numbers in the table statistics. Anything else is an error in the job, raised when it is submitted
+    if isinstance(x, np.generic):
+        return x.item()
+    raise TypeError(f"Object of type {type(x).__name__} is not JSON serializable")
+
+
+class JobQueue(object):
+    '''
+    Jobs are JSON payloads identified by a batch name and a game number, so that submitting a game again finds its result if it is done.
+    A job is 'pending', then 'running' once a worker claims it, then 'done' with its JSON result, 'failed' with the error of the worker, or 'cancelled'.
+    A running job not finished after lease seconds is given to another worker
+    '''
+    def __init__(self, path, timeout = 60):
+        self.path = path
+        self.db = sqlite3.connect(path, timeout = timeout, isolation_level = None)
+        self.db.execute("""CREATE TABLE IF NOT EXISTS jobs (id INTEGER PRIMARY KEY, batch TEXT, game INTEGER, payload TEXT,
+                           status TEXT, worker TEXT, claimed REAL, result TEXT, UNIQUE (batch, game))""")
+        self.db.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+
+    def submit(self, batch, game, payload):
+        '''
+        Adds a job and returns its id. A job already in the queue is left as it is, unless it was cancelled or failed: it is played again
+        '''
+        self.db.execute("INSERT OR IGNORE INTO jobs (batch, game, payload, status) VALUES (?, ?, ?, 'pending')",
+                        (batch, game, json.dumps(payload, default = _json)))
+        job, status = self.db.execute("SELECT id, status FROM jobs WHERE batch = ? AND game = ?", (batch, game)).fetchone()
+        if status in ('cancelled', 'failed'):
+            self.db.execute("UPDATE jobs SET status = 'pending' WHERE id = ?", (job,))
+        return job
+
+    def claim(self, worker, lease = 3600):
+        '''
+        Id and payload of the next job to play, now running for worker. None if there is none
+        '''
+        self.db.execute("BEGIN IMMEDIATE")
+        try:
+            row = self.db.execute("""SELECT id, payload FROM jobs WHERE status = 'pending' OR (status = 'running' AND claimed < ?)
+                                     ORDER BY id LIMIT 1""", (time.time() - lease,)).fetchone()
+            if not row is None:
+                self.db.execute("UPDATE jobs SET status = 'running', worker = ?, claimed = ? WHERE id = ?", (worker, time.time(), row[0]))
+            self.db.execute("COMMIT")
+        except Exception:
+            self.db.execute("ROLLBACK")
+            raise
+        return None if row is None else (row[0], json.loads(row[1]))
+
+    def finish(self, job, result):
+        self.db.execute("UPDATE jobs SET status = 'done', result = ? WHERE id = ?", (json.dumps(result, default = _json), job))
+
+    def fail(self, job, error):
+        self.db.execute("UPDATE jobs SET status = 'failed', result = ? WHERE id = ?", (json.dumps(error), job))
+
+    def cancel(self, job):
+        self.db.execute("UPDATE jobs SET status = 'cancelled' WHERE id = ? AND status != 'done'", (job,))
+
+    def result(self, job):
+        '''
+        Result of a done job, None if it is not done yet. Raises an Exception with the error of the worker if it failed
+        '''
+        status, result, worker = self.db.execute("SELECT status, result, worker FROM jobs WHERE id = ?", (job,)).fetchone()
+        if status == 'failed':
+            raise Exception(f"Job {job} failed on worker {worker}:\n{json.loads(result)}")
+        return json.loads(result) if status == 'done' else None
+
+    def open(self):
+        self.db.execute("INSERT OR REPLACE INTO meta VALUES ('closed', '0')")
+
+    def close(self):
+        '''
+        Tells the workers to stop once there are no jobs left
+        '''
+        self.db.execute("INSERT OR REPLACE INTO meta VALUES ('closed', '1')")
+
+    def closed(self):
+        row = self.db.execute("SELECT value FROM meta WHERE key = 'closed'").fetchone()
+        return not row is None and row[0] == '1'
+
+    def run(self, batch, games, payloads, keep = None, window = 64, poll = 0.05):
+        '''
+        Submits the payloads, at most window ahead of the last result, and gives their results in order. Raises an Exception if a job failed.
+        games are their game numbers. As with tournament.play_games, a job is not submitted if keep(k) is false, and None is given for it.
+        A submitted job for which keep(k) has become false is cancelled if no worker has finished it
+        '''
+        if keep is None:
+            keep = lambda k: True
+        submitted = deque()
+        k = 0
+        while k < len(payloads) or submitted:
+            while k < len(payloads) and len(submitted) < window:
+                submitted.append((k, self.submit(batch, games[k], payloads[k]) if keep(k) else None))
+                k += 1
+            i, job = submitted.popleft()
+            if not job is None and not keep(i):
+                self.cancel(job)
+                job = None
+            if job is None:
+                yield None
+                continue
+            result = self.result(job)
+            while result is None:
+                time.sleep(poll)
+                result = self.result(job)
+            yield tuple(result)
+
+
+def play_job(payload):
+    '''
+    Plays the game of a payload made by tournament.py, from the specifications of the bots
+    '''
+    # tournament imports this module
+    import tournament as TOURNAMENT
+    white_bot = TOURNAMENT.bot_from_json_dict(dict(payload['white']), TOURNAMENT.bot_dict)
+    black_bot = TOURNAMENT.bot_from_json_dict(dict(payload['black']), TOURNAMENT.bot_dict)
+    white_bot.log_tables = black_bot.log_tables = payload['log_tables']
+    return TOURNAMENT.play_game((white_bot, black_bot, payload['seed'], False, GAME.engines[payload['engine']], payload['cards']))
+
+
+def work(path, poll = 1.0, lease = 3600):
+    '''
+    Plays the jobs of the queue in path until it is closed and empty. A job that raises an exception is marked failed with its traceback
+    '''
+    queue = JobQueue(path)
+    worker = "{}:{}".format(socket.gethostname(), os.getpid())
+    while True:
+        claimed = queue.claim(worker, lease)
+        if claimed is None:
+            if queue.closed():
+                return
+            time.sleep(poll)
+            continue
+        job, payload = claimed
+        try:
+            result = play_job(payload)
+        except Exception:
+            queue.fail(job, traceback.format_exc())
+            continue
+        queue.finish(job, result)
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(formatter_class=ArgumentDefaultsHelpFormatter)
+    parser.add_argument("--queue", help="SQLite file of the queue, given to tournament.py --queue", required=True)
+    parser.add_argument("--poll", help="Seconds between two looks at an empty queue", default=1.0)
+    parser.add_argument("--lease", help="Seconds after which a game claimed by a worker that did not finish it is given to another", default=3600)
+    args = parser.parse_args()
+    work(args.queue, float(args.poll), float(args.lease))
@@ -4,7 +4,7 @@ Importations
 
 import numpy as np
 from copy import deepcopy
-import random
+from itertools import combinations
 
 """
 Constants
@@ -19,6 +19,11 @@ ref_values = [Empty, White, Black, WhiteK, BlackK]
 
 Dx = 5
 Dy = 5
+
+# Seed of the Zobrist keys. Boards created with the same seed hash the same position to the same value
+ZOBRIST_SEED = 20210406
+# Bits of the hash above the 64-bit key, used by the transposition tables to tell apart positions with the same key
+CHECK_BITS = 32
 piece_2_char = {Empty: '-', White: 'w', Black: 'b', WhiteK: 'W', BlackK: 'B'}
 def char_piece(x):
   return piece_2_char[x]
@@ -64,88 +69,198 @@ cards = {"Rooster":[(-1,1),(0,1), (0,-1),(1,-1)],
 "Crane":[(-1,0), (1,-1),(1,1)],
 "Ox":[(-1,0), (1,0),(0,1)]}
 
+"""
+Move tables
+"""
+
+Squares = Dx * Dy
+
+_card_targets = {}
+
+def card_targets(name, color):
+    """
+    For each of the 25 squares, list of squares (x2, y2, bit index) reachable using card 'name' when playing 'color'
+    Black moves use the card upside down
+    """
+    key = (name, color)
+    if not key in _card_targets:
+        table = []
+        for sq in range(Squares):
+            x, y = divmod(sq, Dy)
+            targets = []
+            for move_card in cards[name]:
+                x2, y2 = x + color * move_card[0], y + color * move_card[1]
+                if 0 <= x2 < Dx and 0 <= y2 < Dy:
+                    targets += [(x2, y2, Dy * x2 + y2)]
+            table.append(targets)
+        _card_targets[key] = table
+    return _card_targets[key]
+
+
+class MoveTable(dict):
+    """
+    Targets of every card of a game: table[color][ind_card][origin square] -> [(x2, y2, square), ...]
+    The five cards never change during a game, so boards of the same game share the table instead of copying it
+    """
+    def __deepcopy__(self, memo):
+        return self
+
+    def __reduce__(self):
+        return (move_table, (self.card_names,))
+
+_move_tables = {}
+
+def move_table(chosen_cards):
+    """
+    Move table for the five cards of a game, built once per card set
+    """
+    key = tuple(chosen_cards)
+    if not key in _move_tables:
+        table = MoveTable()
+        table.card_names = key
+        for color in (White, Black):
+            table[color] = [card_targets(name, color) for name in key]
+        _move_tables[key] = table
+    return _move_tables[key]
+
+
+def card_sets():
+    """
+    All the sets of 5 of the 16 cards, C(16, 5) = 4368
+    """
+    return list(combinations(cards.keys(), 5))
+
+def deals(card_set):
+    """
+    The 30 ways of dealing 5 cards, two to White, one in the middle and two to Black, as card_names for Board
+    """
+    result = []
+    for white in combinations(card_set, 2):
+        rest = [c for c in card_set if not c in white]
+        for black in combinations(rest, 2):
+            middle = [c for c in rest if not c in black]
+            result += [list(white) + middle + list(black)]
+    return result
+
+def openings(n = None, seed = 0):
+    """
+    n different deals drawn with seed among the 4368 * 30 deals of all the card sets. All of them, in order, if n is None
+    """
+    sets = card_sets()
+    total = len(sets) * 30
+    if n is None:
+        chosen = range(total)
+    else:
+        chosen = np.random.RandomState(seed).choice(total, size = n, replace = False)
+    return [deals(sets[k // 30])[k % 30] for k in chosen]
+
+
 """
 Board class
 """
 
 class Board(object):
-
-    def __init__(self):
+    '''
+    card_names are the 5 cards in the order of chosen_cards: the two of White, the middle one and the two of Black.
+    Without them, they are drawn with the NumPy random state, or with seed if given
+    '''
+    def __init__(self, card_names = None, seed = None):
         self.h = 0
-        self.hashTable, self.hashTurn, self.hashCards = create_hash_tables()
+        self.keys = zobrist_keys(ZOBRIST_SEED)
         self.turn = White
-        self.h = self.h ^ self.hashTurn
+        self.h = self.h ^ self.keys.hashTurn
+        self._init_pieces()
+
+        if card_names is None:
+            rng = np.random if seed is None else np.random.RandomState(seed)
+            self.chosen_cards = rng.choice(list(cards.keys()), size = 5, replace= False)
+        else:
+            if len(set(card_names)) != 5 or not all(name in cards for name in card_names):
+                raise Exception(f"A board needs 5 different cards among {', '.join(cards.keys())}, got {card_names}")
+            self.chosen_cards = np.array(card_names)
+        self.w_cards = [0,1]
+        self.h = self.h ^ self.keys.hashCards[White][0]
+        self.h = self.h ^ self.keys.hashCards[White][1]
+        self.b_cards = [3,4]
+        self.h = self.h ^ self.keys.hashCards[Black][3]
+        self.h = self.h ^ self.keys.hashCards[Black][4]
+        self.m_card = 2
+        self.h = self.h ^ self.keys.hashCards[Empty][2]
+        self.move_table = move_table(self.chosen_cards)
+
+        # Legal moves and score of the current position, computed once and kept until the next move
+        self._moves = None
+        self._score = None
+
+    def _init_pieces(self):
         self.board = np.zeros((Dx, Dy))
+        self.king_pos = {White: (4, 2), Black: (0, 2)}
 
         for j in range (0, Dy):
             self.board[4][j] = White
-            if j != 2: self.h = self.h ^ self.hashTable[White][4][j]
+            if j != 2: self.h = self.h ^ self.keys.hashTable[White][4][j]
         self.board[4][2] = WhiteK
-        self.h = self.h ^self. hashTable[WhiteK][4][2]
+        self.h = self.h ^self.keys.hashTable[WhiteK][4][2]
 
         for j in range (0, Dy):
             self.board[0][j] = Black
-            if j != 2: self.h = self.h ^ self.hashTable[Black][0][j]
+            if j != 2: self.h = self.h ^ self.keys.hashTable[Black][0][j]
         self.board[0][2] = BlackK
-        self.h = self.h ^ self.hashTable[BlackK][0][2]
+        self.h = self.h ^ self.keys.hashTable[BlackK][0][2]
 
-        self.chosen_cards = np.random.choice(list(cards.keys()), size = 5, replace= False)
-        self.w_cards = [0,1]
-        self.h = self.h ^ self.hashCards[White][0]
-        self.h = self.h ^ self.hashCards[White][1]
-        self.b_cards = [3,4]
-        self.h = self.h ^ self.hashCards[Black][3]
-        self.h = self.h ^ self.hashCards[Black][4]
-        self.m_card = 2
-        self.h = self.h ^ self.hashCards[Empty][2]
-        
-        
+    def piece(self, x, y):
+        """
+        Piece standing on square (x, y)
+        """
+        return self.board[x][y]
 
     def legalMoves(self):
+        """
+        Legal moves of the player to move. The list is shared until the next move, so it must not be modified
+        """
+        if self._moves is None:
+            self._moves = self._generate_moves()
+        return self._moves
+
+    def _generate_moves(self):
         moves = []
+        color = self.turn
+        in_hand = self.w_cards if color == White else self.b_cards
+        tables = [(ind_card, self.move_table[color][ind_card]) for ind_card in sorted(in_hand)]
+        board = self.board.tolist()
         for i in range(0, Dx):
             for j in range(0, Dy):
-                if self.board[i][j] * self.turn > 0: ## on vérifie si c'est la meme couleur
-                    if self.turn == White:
-                        for ind_card in sorted(self.w_cards):
-                            for move_card in cards[self.chosen_cards[ind_card]]:
-                                x2, y2 = i + move_card[0], j + move_card[1]
-                                m = Move(self.turn, i, j, x2, y2, ind_card)
-                                if m.valid(self):
-                                    moves += [m]
-
-
-                    elif self.turn == Black:
-                        for ind_card in sorted(self.b_cards):
-                            for move_card in cards[self.chosen_cards[ind_card]]:
-                                x2, y2 = i - move_card[0], j - move_card[1]
-                                m = Move(self.turn, i, j, x2, y2, ind_card)
-                                if m.valid(self):
-                                    moves += [m]
-                    
-                    else:
-                        pass
-        # if len(moves) == 0:
-        #     for ind_card in self.w_cards:
-        #         moves += [Move(self.turn, 0, 0, 0, 0, ind_card)]
+                if board[i][j] * color > 0: ## on vérifie si c'est la meme couleur
+                    sq = Dy * i + j
+                    for ind_card, table in tables:
+                        for x2, y2, _ in table[sq]:
+                            if board[x2][y2] * color <= 0:
+                                moves += [Move(color, i, j, x2, y2, ind_card)]
         return moves
 
     def score(self):
+        """
+        1.0 if White won, 0.0 if Black won, 0.5 if the game is not over
+        """
+        if self._score is None:
+            self._score = self._status()
+        return self._score
+
+    def _status(self):
         """
         checking if the ennemy Sensei is on the protected square
         """
-        if (self.board [0] [2] == WhiteK):
+        if self.king_pos[White] == (0, 2):
             return 1.0
-        elif (self.board [Dx - 1] [2] == BlackK):
+        elif self.king_pos[Black] == (Dx - 1, 2):
             return 0.0
         """
         Checking if one of the Sensei died
         """
-        if abs(self.board.sum()) >= 5:
-            if self.board.sum() > 0:
-                return 1.0
-            else:
-                return 0.0
+        if self.king_pos[Black] is None:
+            return 1.0
+        if self.king_pos[White] is None:
+            return 0.0
 
         l = self.legalMoves ()
         if len (l) == 0:
@@ -164,7 +279,12 @@ class Board(object):
         return True
 
     def play(self, move):
+        """
+        Plays move and returns the information needed by undo to take it back
+        """
         pass_turn = False
+        in_spot = None
+        undo_info = (self.h, self._card_position(move), self._moves, self._score)
         if not move.valid(self):
             print("Trying to play invalid move. Passing")
             pass_turn = True
@@ -173,42 +293,96 @@ class Board(object):
             in_spot = deepcopy(self.board[move.x2, move.y2])
             moving_out = self.board[move.x1, move.y1]
             if in_spot != Empty:
-                self.h = self.h ^ self.hashTable[in_spot][move.x2][move.y2]
+                self.h = self.h ^ self.keys.hashTable[in_spot][move.x2][move.y2]
+                if abs(in_spot) == WhiteK:
+                    self.king_pos[-move.color] = None
+            if abs(moving_out) == WhiteK:
+                self.king_pos[move.color] = (move.x2, move.y2)
                 
-            self.h = self.h ^ self.hashTable[moving_out][move.x1][move.y1]
-            self.h = self.h ^ self.hashTable[moving_out][move.x2][move.y2]
+            self.h = self.h ^ self.keys.hashTable[moving_out][move.x1][move.y1]
+            self.h = self.h ^ self.keys.hashTable[moving_out][move.x2][move.y2]
             self.board[move.x2, move.y2] = deepcopy(self.board[move.x1, move.y1])
             self.board[move.x1, move.y1] = Empty
         
         # Even if pass, cards still change, and also turn
+        self._play_cards(move)
+        return undo_info + (in_spot,)
+        
+        # print(self.board)
+        # print(self.w_cards, self.m_card, self.b_cards)
+
+    def undo(self, move, info):
+        """
+        Takes back move, which must be the last move played. info is what play returned
+        """
+        h, card_position, moves, score, in_spot = info
+        if not in_spot is None:
+            self.board[move.x1, move.y1] = self.board[move.x2, move.y2]
+            self.board[move.x2, move.y2] = in_spot
+            if in_spot != Empty:
+                if abs(in_spot) == WhiteK:
+                    self.king_pos[-move.color] = (move.x2, move.y2)
+            if abs(self.board[move.x1, move.y1]) == WhiteK:
+                self.king_pos[move.color] = (move.x1, move.y1)
+        self._undo_cards(move, card_position)
+        self.h = h
+        self._moves = moves
+        self._score = score
+
+    def _card_position(self, move):
+        """
+        Position of the card of move in the hand of the player, so that undo restores the same hand
+        """
+        hand = self.w_cards if move.color == White else self.b_cards
+        return hand.index(move.card)
+
+    def _play_cards(self, move):
+        """
+        Card exchange, turn change and their part of the hash
+        """
         if move.color == White:
-            self.w_cards.remove(move.card)            
-            self.w_cards += [deepcopy(self.m_card)]
+            self.w_cards.remove(move.card)
+            self.w_cards += [self.m_card]
             self.turn = Black
         else:
             self.b_cards.remove(move.card)
-            self.b_cards += [deepcopy(self.m_card)]
+            self.b_cards += [self.m_card]
             self.turn = White
-        self.h = self.h ^ self.hashCards[move.color][move.card]
-        self.h = self.h ^ self.hashCards[move.color][self.m_card]
-        self.h = self.h ^ self.hashCards[Empty][move.card]
-        self.h = self.h ^ self.hashCards[Empty][self.m_card]
-        self.h = self.h ^ self.hashTurn
+        self.h = self.h ^ self.keys.hashCards[move.color][move.card]
+        self.h = self.h ^ self.keys.hashCards[move.color][self.m_card]
+        self.h = self.h ^ self.keys.hashCards[Empty][move.card]
+        self.h = self.h ^ self.keys.hashCards[Empty][self.m_card]
+        self.h = self.h ^ self.keys.hashTurn
         self.m_card = move.card
-        return
-        
-        # print(self.board)
-        # print(self.w_cards, self.m_card, self.b_cards)
+        self._moves = None
+        self._score = None
+
+    def _undo_cards(self, move, card_position):
+        hand = self.w_cards if move.color == White else self.b_cards
+        self.m_card = hand.pop()
+        hand.insert(card_position, move.card)
+        self.turn = move.color
 
-    def playout (self):
+    def playout (self, history = None):
+        """
+        Random game until the end. If history is a list, the (move, undo info) pairs played are appended to it
+        """
         while (True):
             moves = self.legalMoves()
             if self.terminal():
                 return self.score()
             n = np.random.randint(0,len(moves))
-            self.play (moves [n])
+            info = self.play (moves [n])
+            if not history is None:
+                history += [(moves[n], info)]
             # input("Next ?")
 
+    def batchPlayout(self, n, amaf = False):
+        """
+        n random games from this position played together, see batch_playouts. The board is not modified
+        """
+        return batch_playouts(self, n, amaf)
+
     def play_random(self):
         moves = self.legalMoves()
         if self.terminal():
@@ -216,7 +390,7 @@ class Board(object):
         n = np.random.randint(0,len(moves))
         self.play (moves [n])
     
-    def playoutAMAF(self, played):
+    def playoutAMAF(self, played, history = None):
         while(True):
             moves = []
             moves = self.legalMoves()
@@ -224,7 +398,9 @@ class Board(object):
                 return self.score()
             n = np.random.randint(0,len(moves))
             played += [moves[n].code(self)]
-            self.play(moves[n])
+            info = self.play(moves[n])
+            if not history is None:
+                history += [(moves[n], info)]
             
     
     def __repr__(self):
@@ -238,6 +414,248 @@ class Board(object):
       return text
       
 
+"""
+Bitboard backend
+"""
+
+# Bit of the shrine each master has to reach
+WhiteGoal = 1 << (Dy * 0 + 2)
+BlackGoal = 1 << (Dy * (Dx - 1) + 2)
+
+class BitBoard(Board):
+    """
+    Same game as Board, but each side's pawns and master are stored as 25-bit integers.
+    Square (x, y) is bit Dy*x + y. legalMoves, play, score and terminal give the same results as Board
+    """
+
+    def _init_pieces(self):
+        self.pawns = {White: 0, Black: 0}
+        self.kings = {White: 0, Black: 0}
+        for j in range(0, Dy):
+            if j != 2:
+                self.pawns[White] |= 1 << (Dy * 4 + j)
+                self.h = self.h ^ self.keys.hashTable[White][4][j]
+                self.pawns[Black] |= 1 << j
+                self.h = self.h ^ self.keys.hashTable[Black][0][j]
+        self.kings[White] = 1 << (Dy * 4 + 2)
+        self.h = self.h ^ self.keys.hashTable[WhiteK][4][2]
+        self.kings[Black] = 1 << 2
+        self.h = self.h ^ self.keys.hashTable[BlackK][0][2]
+
+    @property
+    def board(self):
+        """
+        Array view of the position, as stored by Board. Used for display only
+        """
+        board = np.zeros((Dx, Dy))
+        for i in range(Dx):
+            for j in range(Dy):
+                board[i][j] = self.piece(i, j)
+        return board
+
+    def piece(self, x, y):
+        bit = 1 << (Dy * x + y)
+        for color in (White, Black):
+            if self.pawns[color] & bit:
+                return color
+            if self.kings[color] & bit:
+                return color * WhiteK
+        return Empty
+
+    def _generate_moves(self):
+        moves = []
+        color = self.turn
+        own = self.pawns[color] | self.kings[color]
+        in_hand = self.w_cards if color == White else self.b_cards
+        tables = [(ind_card, self.move_table[color][ind_card]) for ind_card in sorted(in_hand)]
+        rest = own
+        while rest:
+            low = rest & -rest
+            rest ^= low
+            sq = low.bit_length() - 1
+            x1, y1 = divmod(sq, Dy)
+            for ind_card, table in tables:
+                for x2, y2, sq2 in table[sq]:
+                    if not (own >> sq2) & 1:
+                        moves += [Move(color, x1, y1, x2, y2, ind_card)]
+        return moves
+
+    def _status(self):
+        """
+        checking if a Sensei is on the enemy shrine, then if one of the Sensei died
+        """
+        if self.kings[White] & WhiteGoal:
+            return 1.0
+        elif self.kings[Black] & BlackGoal:
+            return 0.0
+        if not self.kings[Black]:
+            return 1.0
+        if not self.kings[White]:
+            return 0.0
+
+        if len(self.legalMoves()) == 0:
+            if self.turn == Black:
+                return 1.0
+            else:
+                return 0.0
+        return 0.5
+
+    def play(self, move):
+        in_spot = None
+        undo_info = (self.h, self._card_position(move), self._moves, self._score)
+        if not move.valid(self):
+            print("Trying to play invalid move. Passing")
+        else:
+            in_spot = Empty
+            color, other = move.color, -move.color
+            bit1 = 1 << (Dy * move.x1 + move.y1)
+            bit2 = 1 << (Dy * move.x2 + move.y2)
+            if self.pawns[other] & bit2:
+                self.pawns[other] ^= bit2
+                in_spot = other
+                self.h = self.h ^ self.keys.hashTable[other][move.x2][move.y2]
+            elif self.kings[other] & bit2:
+                self.kings[other] ^= bit2
+                in_spot = other * WhiteK
+                self.h = self.h ^ self.keys.hashTable[other * WhiteK][move.x2][move.y2]
+
+            if self.kings[color] & bit1:
+                self.kings[color] ^= bit1 | bit2
+                moving_out = color * WhiteK
+            else:
+                self.pawns[color] ^= bit1 | bit2
+                moving_out = color
+            self.h = self.h ^ self.keys.hashTable[moving_out][move.x1][move.y1]
+            self.h = self.h ^ self.keys.hashTable[moving_out][move.x2][move.y2]
+
+        # Even if pass, cards still change, and also turn
+        self._play_cards(move)
+        return undo_info + (in_spot,)
+
+    def undo(self, move, info):
+        h, card_position, moves, score, in_spot = info
+        if not in_spot is None:
+            color, other = move.color, -move.color
+            bit1 = 1 << (Dy * move.x1 + move.y1)
+            bit2 = 1 << (Dy * move.x2 + move.y2)
+            if self.kings[color] & bit2:
+                self.kings[color] ^= bit1 | bit2
+            else:
+                self.pawns[color] ^= bit1 | bit2
+            if in_spot == other:
+                self.pawns[other] |= bit2
+            elif in_spot == other * WhiteK:
+                self.kings[other] |= bit2
+        self._undo_cards(move, card_position)
+        self.h = h
+        self._moves = moves
+        self._score = score
+
+
+"""
+Batch playouts
+"""
+
+_batch_targets = {}
+
+def batch_targets(chosen_cards):
+    """
+    Targets of every (player, card, origin, move of the card) for batch_playouts, -1 if out of the board.
+    Built once per card set, like move_table, and read-only
+    """
+    key = tuple(chosen_cards)
+    if not key in _batch_targets:
+        targets = np.full((2, ONITAMA_CARDS_IN_GAME, Squares, ONITAMA_MAX_MOVES_CARD), -1, dtype = np.int64)
+        for p, color in enumerate((White, Black)):
+            for ind_card, name in enumerate(key):
+                for sq in range(Squares):
+                    x, y = divmod(sq, Dy)
+                    for k, move_card in enumerate(cards[name]):
+                        x2, y2 = x + color * move_card[0], y + color * move_card[1]
+                        if 0 <= x2 < Dx and 0 <= y2 < Dy:
+                            targets[p, ind_card, sq, k] = Dy * x2 + y2
+        targets.flags.writeable = False
+        _batch_targets[key] = targets
+    return _batch_targets[key]
+
+def batch_playouts(board, n, amaf = False):
+    """
+    n independent random games from board, played together with NumPy arrays.
+    Returns the n scores (1.0 White won, 0.0 Black won). If amaf is True, also returns for each
+    game the list of Move.code values played, as playoutAMAF adds them to 'played'
+    """
+    results = np.full(n, board.score())
+    played = [[] for _ in range(n)] if amaf else None
+    if board.terminal():
+        return (results, played) if amaf else results
+
+    targets = batch_targets(board.chosen_cards)
+    goal = np.array([Dy * 0 + 2, Dy * (Dx - 1) + 2])
+
+    cells = np.tile(np.array([board.piece(*divmod(sq, Dy)) for sq in range(Squares)], dtype = np.int64), (n, 1))
+    turn = np.full(n, board.turn, dtype = np.int64)
+    hands = np.tile(np.array([sorted(board.w_cards), sorted(board.b_cards)], dtype = np.int64), (n, 1, 1))
+    middle = np.full(n, board.m_card, dtype = np.int64)
+    active = np.arange(n)
+    steps = []
+
+    while len(active) > 0:
+        m = len(active)
+        rows = np.arange(m)
+        color = turn[active]
+        p = (color == Black).astype(np.int64)
+        hand = hands[active, p]
+        own = cells[active] * color[:, None] > 0
+        tg = targets[p[:, None], hand]
+        arrival = np.take_along_axis(cells[active], np.where(tg < 0, 0, tg).reshape(m, -1), axis = 1).reshape(tg.shape)
+        valid = (tg >= 0) & own[:, None, :, None] & (arrival * color[:, None, None, None] <= 0)
+        valid = valid.reshape(m, -1)
+        count = valid.sum(axis = 1)
+
+        # No legal moves: the player to move loses
+        stuck = count == 0
+        results[active[stuck]] = (color[stuck] == Black).astype(float)
+
+        # Random legal move for the others
+        go = ~stuck
+        r = (np.random.random(m) * count).astype(np.int64)
+        choice = (np.cumsum(valid, axis = 1) <= r[:, None]).sum(axis = 1)
+        choice, rows, color, p, hand, tg = choice[go], rows[go], color[go], p[go], hand[go], tg[go]
+        games = active[go]
+        in_hand, rest = np.divmod(choice, Squares * ONITAMA_MAX_MOVES_CARD)
+        origin, k = np.divmod(rest, ONITAMA_MAX_MOVES_CARD)
+        sub = np.arange(len(games))
+        target = tg[sub, in_hand, origin, k]
+        card = hand[sub, in_hand]
+        moving = cells[games, origin]
+        captured = cells[games, target]
+
+        if amaf:
+            codes = 2000 * p + 1000 * (np.abs(moving) > 2) + 500 * (captured != Empty) + 125 * k + 25 * card + origin
+            steps.append((games, codes))
+
+        cells[games, target] = moving
+        cells[games, origin] = Empty
+        hands[games, p, in_hand] = middle[games]
+        middle[games] = card
+        turn[games] = -color
+
+        # Master captured or master on the enemy shrine: the player who moved wins
+        won = (np.abs(captured) == WhiteK) | ((np.abs(moving) == WhiteK) & (target == goal[p]))
+        results[games[won]] = (color[won] == White).astype(float)
+        active = games[~won]
+
+    if amaf:
+        if steps:
+            games = np.concatenate([g for g, _ in steps])
+            codes = np.concatenate([c for _, c in steps])
+            order = np.argsort(games, kind = 'stable')
+            splits = np.cumsum(np.bincount(games, minlength = n))[:-1]
+            played = [c.tolist() for c in np.split(codes[order], splits)]
+        return results, played
+    return results
+
+
 """
 Move class
 """
@@ -264,25 +682,18 @@ class Move(object):
 
     def valid(self, board):
         # print(self.x1, self.y1, self.x2, self.y2)
-        if board.board[self.x1][self.y1] * self.color <= 0:
+        if board.piece(self.x1, self.y1) * self.color <= 0:
           return False
           
         if self.x2 >= Dx or self.y2 >= Dy or self.x2 < 0 or self.y2 < 0:
             return False
-        if board.board[self.x2][self.y2] * self.color > 0:
+        if board.piece(self.x2, self.y2) * self.color > 0:
             # self.board[i][j] * self.turn > 0
             return False
         
         # Lastly,check if card allows this move
-        for move_card in cards[board.chosen_cards[self.card]]:
-          if self.color==White:
-            x2, y2 = self.x1 + move_card[0], self.y1 + move_card[1]
-          else:
-            x2, y2 = self.x1 - move_card[0], self.y1 - move_card[1]
-          
-          if self.x2 == x2 and self.y2 == y2: return True
-        
-        return False
+        targets = board.move_table[self.color][self.card][Dy * self.x1 + self.y1]
+        return (self.x2, self.y2, Dy * self.x2 + self.y2) in targets
     
     def move_index_in_card(self, board):
         if self.color == White:
@@ -304,8 +715,8 @@ class Move(object):
         init_pos = Dy * self.x1 + self.y1 # 25 options
         card = self.card # 5 options        
         move_index = self.move_index_in_card(board) # 4 options
-        captures = 0 if board.board[self.x2,self.y2] == Empty else 1 # 2 options
-        is_sensei = 1 if abs(board.board[self.x1,self.y1])>2 else 0 # 2 options
+        captures = 0 if board.piece(self.x2, self.y2) == Empty else 1 # 2 options
+        is_sensei = 1 if abs(board.piece(self.x1, self.y1))>2 else 0 # 2 options
         color = 0 if self.color == White else 1
         # 25-position, 5-card, max 4-move_per_card, 2-is_capture, 2-is_sensei
         # Total of 2000 options for each color
@@ -313,7 +724,18 @@ class Move(object):
         # color -> is_sensei -> captures -> move_index -> card -> position
         # print(color, is_sensei, captures, move_index, card, init_pos)
         return 2000*color + 1000*is_sensei + 500*captures + 125*move_index + 25*card + init_pos
-        
+
+    @staticmethod
+    def from_code(code, board):
+        """
+        Decode a move: the move whose code(board) is code, on the board it was played from
+        """
+        color = White if code < 2000 else Black
+        init_pos, card, move_index = code % 25, (code // 25) % 5, (code // 125) % 4
+        x1, y1 = divmod(init_pos, Dy)
+        dx, dy = cards[board.chosen_cards[card]][move_index]
+        return Move(color, x1, y1, x1 + color * dx, y1 + color * dy, card)
+
     def __repr__(self):
         return "Card {}: ({},{}) -> ({},{})".format(self.card, self.x1, self.y1, self.x2, self.y2)
 
@@ -381,28 +803,53 @@ def UCB (board, n):
 """
 Hashtables
 """
-def create_hash_tables():
-    hashTable = dict()
-    # ?? Empty has to be considered?
-    for k in ref_values: ##5 possble par cases, empty, rouge roi ou pion, bleu roi ou pion
-        l = []
-        for i in range (Dx):
-            l1 = []
-            for j in range (Dy):
-                l1.append (random.randint (0, 2 ** 64))
-            l.append (l1)
-        hashTable[k] = deepcopy(l)
-        
-    hashTurn = random.randint (0, 2 ** 64) ##le tour
-    
-    hashCards = dict()
-    values= [Empty, White, Black]
-    for k in values: ##3 emplacements de cartes possible, bleu, rouge ou milieu
-        l = []
-        for i in range (5): ## 5 cartes
-            l.append (random.randint (0, 2 ** 64))
-        hashCards[k] = deepcopy(l)
-    return hashTable, hashTurn, hashCards
+class ZobristKeys(object):
+    """
+    Random 64-bit keys used to hash positions, drawn once from seed.
+    pieces[ref_values.index(piece), x, y], turn and cards[place, ind_card] (place is Empty, White or Black) are the uint64 arrays.
+    checkPieces, checkTurn and checkCards are independent CHECK_BITS-bit keys, drawn after them.
+    hashTable, hashTurn and hashCards hold both as Python ints, the check keys above bit 64, indexed by piece and place values, for the incremental updates in play.
+    Board.h is then a 64-bit key plus a check value that costs nothing more to update
+    Boards only keep a reference to the keys of their seed, even when copied or pickled
+    """
+    def __init__(self, seed):
+        self.seed = seed
+        rng = np.random.default_rng(seed)
+        self.pieces = rng.integers(0, 2 ** 64, size = (len(ref_values), Dx, Dy), dtype = np.uint64)
+        self.turn = rng.integers(0, 2 ** 64, dtype = np.uint64)
+        self.cards = rng.integers(0, 2 ** 64, size = (3, ONITAMA_CARDS_IN_GAME), dtype = np.uint64)
+        self.checkPieces = rng.integers(0, 2 ** CHECK_BITS, size = self.pieces.shape, dtype = np.uint64)
+        self.checkTurn = rng.integers(0, 2 ** CHECK_BITS, dtype = np.uint64)
+        self.checkCards = rng.integers(0, 2 ** CHECK_BITS, size = self.cards.shape, dtype = np.uint64)
+
+        pieces = self.pieces.astype(object) | (self.checkPieces.astype(object) << 64)
+        cards = self.cards.astype(object) | (self.checkCards.astype(object) << 64)
+        self.hashTable = {k: pieces[i].tolist() for i, k in enumerate(ref_values)}
+        self.hashTurn = int(self.turn) | (int(self.checkTurn) << 64)
+        self.hashCards = {k: cards[k].tolist() for k in [Empty, White, Black]}
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def __reduce__(self):
+        return (zobrist_keys, (self.seed,))
+
+_zobrist_keys = {}
+
+def zobrist_keys(seed):
+    """
+    Keys for seed, generated once per process
+    """
+    if not seed in _zobrist_keys:
+        _zobrist_keys[seed] = ZobristKeys(seed)
+    return _zobrist_keys[seed]
+
+"""
+Available game engines
+"""
+
+engines = {'array': Board,
+           'bitboard': BitBoard}
 
 """
 main
@@ -5,38 +5,108 @@ Algorithmes MCTS, cours de Tristan CAZENAVE (https://www.lamsade.dauphine.fr/~ca
 ##Importations
 
 import numpy as np
-import copy
-import sys
+import time
+from itertools import cycle
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.util import Finalize
 
-##Constantes
-MAX_RECURSION_DELTA = 850
+"""
+Board state
+"""
+
+def undo_all(board, history):
+    '''
+    Takes back every (move, undo info) pair of history, last played first, and empties it.
+    Searches play on the board they receive and give it back unchanged this way, instead of copying it
+    '''
+    while history:
+        move, info = history.pop()
+        board.undo(move, info)
+
+"""
+Budgets
+"""
+
+class Budget(object):
+    '''
+    Limits a search to n simulations, to time_ms milliseconds of wall-clock time, or both.
+    Completed simulations are counted in Table.simulations
+    '''
+    def __init__(self, Table, n = None, time_ms = None):
+        if n is None and time_ms is None:
+            raise Exception("A search needs a budget: a number of simulations 'n' or a time 'time_ms' in milliseconds")
+        self.Table = Table
+        self.n = n
+        self.deadline = None if time_ms is None else time.perf_counter() + float(time_ms) / 1000
+        self.done = 0
+
+    def running(self):
+        '''
+        True while there is budget left. The first simulation is always allowed, so that there is a move to return
+        '''
+        if self.done == 0:
+            return True
+        if not self.n is None and self.done >= self.n:
+            return False
+        if not self.deadline is None and time.perf_counter() >= self.deadline:
+            return False
+        return True
+
+    def spend(self, simulations = 1):
+        self.done += simulations
+        self.Table.simulations += simulations
+
+    def rounds(self, moves, total):
+        '''
+        Moves to simulate during one round of sequential halving.
+        With n, each move gets M simulations as in the original algorithm.
+        With a time budget, the moves are simulated in turns until this round's share of the remaining time is over
+        '''
+        if self.deadline is None:
+            M = int(self.n / (len(moves) * np.log2(total)))
+            for m in moves:
+                for i in range(max(M,1)):
+                    yield m
+        else:
+            rounds_left = len(moves).bit_length() - 1
+            end = time.perf_counter() + (self.deadline - time.perf_counter()) / rounds_left
+            while True:
+                for m in moves:
+                    yield m
+                if time.perf_counter() >= end or not self.running():
+                    break
 
 """
 Shuss
 """
 
-def SHUSS(Table, board, n, c = 128):
+def SHUSS(Table, board, n = None, c = 128, time_ms = None):
     '''
     Take game information from the Transposition Table
     '''
     White, Black = Table.__class__.White, Table.__class__.Black
     MTLM = Table.__class__.MaxTotalLegalMoves
+    budget = Budget(Table, n, time_ms)
     
-    Table.addAMAF(board)
+    if Table.look(board) is None:
+        Table.addAMAF(board)
     t = Table.look(board)
     moves = board.legalMoves()
     total = len(moves)
+    # Index of each move in the entry of the root, which counts the simulations like the nodes of the tree
+    index = {m.code(board): i for i, m in enumerate(moves)}
     nbplayouts = [0.0 for x in range(MTLM)]
     nbwins = [0.0 for x in range(MTLM)]
     
     while len(moves) > 1:
-        M = int(n / (len(moves) * np.log2(total)))
-        for m in moves:          
-            for i in range(max(M,1)):
-                b = copy.deepcopy(board)
-                b.play(m)
+        for m in budget.rounds(moves, total):
                 played = [m.code(board)]
-                res = GRAVE(Table, b, played, t) 
+                turn = board.turn
+                Table.descend(t, index[played[0]], turn)
+                history = [(m, board.play(m))]
+                res = GRAVE(Table, board, played, t, history)
+                undo_all(board, history)
+                Table.update(t, index[played[0]], res, turn)
                 # Doesn't GRAVE do the updateAMAF already?
                 Table.updateAMAF(t, played, res)
                 nbplayouts[m.code(board)] += 1
@@ -44,6 +114,7 @@ def SHUSS(Table, board, n, c = 128):
                     nbwins[m.code(board)] += res
                 else:
                     nbwins[m.code(board)] += 1.0 - res
+                budget.spend()
         moves = bestHalfSHUSS(t, board, moves, nbwins, nbplayouts, c, MTLM , Black)
     return moves[0]
 
@@ -57,11 +128,13 @@ def bestHalfSHUSS(t, board, moves, nbwins, nbplayouts, c = 128, MaxTotalLegalMov
         for m in moves:
             code = m.code(board)
             if notused[code]:
-                                
-                AMAF = t[4][code] / t[3][code]
-                if board.turn == Black:
-                    AMAF = 1 - AMAF
-                bias = AMAF/nbplayouts[code]
+                # No AMAF bias for a move whose statistics were replaced in a FixedTable slot
+                bias = 0.0
+                if t[3][code] > 0:
+                    AMAF = t[4][code] / t[3][code]
+                    if board.turn == Black:
+                        AMAF = 1 - AMAF
+                    bias = AMAF/nbplayouts[code]
                 
                 mu = nbwins[code]/nbplayouts[code] + c*bias
                 if mu > best:
@@ -75,28 +148,28 @@ def bestHalfSHUSS(t, board, moves, nbwins, nbplayouts, c = 128, MaxTotalLegalMov
 SequentialHalving
 """
 
-def SequentialHalving(Table, board, n): 
+def SequentialHalving(Table, board, n = None, time_ms = None): 
     '''
     Take game information from the Transposition Table
     '''
     MTLM = Table.__class__.MaxTotalLegalMoves
+    budget = Budget(Table, n, time_ms)
   
     moves = board.legalMoves()
     total = len(moves)
     nbplayouts = [0.0 for x in range(MTLM)]
     nbwins = [0.0 for x in range(MTLM)]
     while len(moves) > 1:
-        M = int(n / (len(moves)*np.log2(total)))
-        for m in moves:
-            for i in range(max(M,1)):
-                b = copy.deepcopy(board)
-                b.play(m)
-                res = UCT(Table, b)
+        for m in budget.rounds(moves, total):
+                history = [(m, board.play(m))]
+                res = UCT(Table, board, history)
+                undo_all(board, history)
                 nbplayouts[m.code(board)] += 1
                 if board.turn == Table.__class__.White:
                     nbwins[m.code(board)] += res
                 else:
                     nbwins[m.code(board)] += 1.0 - res
+                budget.spend()
         moves = bestHalf(board, moves, nbwins, nbplayouts, MTLM)
     return moves[0]
 
@@ -123,15 +196,27 @@ def bestHalf(board, moves, nbwins, nbplayouts, MaxTotalLegalMoves):
 Grave
 """
 
-def GRAVE(Table, board, played, tref):
-    
-    if (board.terminal()):
-        return board.score()
-    if len(played) >= sys.getrecursionlimit()-MAX_RECURSION_DELTA:
-      return board.score()
-    t = Table.look(board)
-    if t != None:
-        tr = tref
+def GRAVE(Table, board, played, tref, history):
+    '''
+    One simulation: goes down the tree, adds the first new node and plays it out, then updates the nodes of the path.
+    tref is the last node with more than 50 simulations, whose AMAF statistics are used to select the moves.
+    A position already on the path is played out like a new node: a FixedTable keeps the AMAF statistics of a bounded number of moves,
+    and a move whose statistics were replaced is selected again each time the descent comes back to it
+    '''
+    path = []
+    seen = set()
+    tr = tref
+    while True:
+        if (board.terminal()):
+            res = board.score()
+            break
+        t = Table.look(board)
+        if t == None or board.h in seen:
+            if t == None:
+                Table.addAMAF(board)
+            res = board.playoutAMAF(played, history)
+            break
+        seen.add(board.h)
         if t[0] > 50:
             tr = t
         bestValue = -100000.0
@@ -156,32 +241,26 @@ def GRAVE(Table, board, played, tref):
                 bestValue = val
                 best = i
                 bestcode = code
-        board.play(moves[best])
+        turn = board.turn
+        Table.descend(t, best, turn)
+        history += [(moves[best], board.play(moves[best]))]
         played += [bestcode]
-        res = GRAVE(Table, board, played, tr)
-        t[0] += 1
-        t[1][best] += 1
-        t[2][best] += res
-        for i in range(len(played)):
-            code = played[i]
-            seen = False
-            for j in range(i):
-                if played[j] == code:
-                    seen = True
-            if not seen:
-                t[3][code] += 1
-                t[4][code] += res
-        return res
-    else:
-        Table.addAMAF(board)
-        return board.playoutAMAF(played)
+        path += [(t, best, turn)]
+
+    for t, best, turn in reversed(path):
+        Table.update(t, best, res, turn)
+        Table.updateAMAF(t, played, res)
+    return res
 
     
-def BestMoveGRAVE(Table, board, n):    
-    for i in range(n):
+def BestMoveGRAVE(Table, board, n = None, time_ms = None):
+    budget = Budget(Table, n, time_ms)
+    while budget.running():
         t = Table.look(board)
-        b1 = copy.deepcopy(board)
-        _ = GRAVE(Table, b1, [], t)
+        history = []
+        _ = GRAVE(Table, board, [], t, history)
+        undo_all(board, history)
+        budget.spend()
     t = Table.look(board)
     moves = board.legalMoves()
     best = moves[0]
@@ -196,13 +275,23 @@ def BestMoveGRAVE(Table, board, n):
 RAVE
 """
 
-def RAVE(Table, board, played):
-    if (board.terminal()):
-        return board.score()
-    if len(played) >= sys.getrecursionlimit()-MAX_RECURSION_DELTA :
-      return board.score()
-    t = Table.look(board)
-    if t!=None:
+def RAVE(Table, board, played, history):
+    '''
+    One simulation. A position already on the path is played out like a new node, as in GRAVE
+    '''
+    path = []
+    seen = set()
+    while True:
+        if (board.terminal()):
+            res = board.score()
+            break
+        t = Table.look(board)
+        if t == None or board.h in seen:
+            if t == None:
+                Table.addAMAF(board)
+            res = board.playoutAMAF(played, history)
+            break
+        seen.add(board.h)
         bestValue = -10000000.0
         best = 0
         moves = board.legalMoves()
@@ -226,33 +315,26 @@ def RAVE(Table, board, played):
                 bestValue = val
                 best = i
                 bestCode = code
-        board.play(moves[best])
-        res = RAVE(Table, board, played)
-        t[0] += 1
-        t[1][best] += 1
-        t[2][best] += res
+        turn = board.turn
+        Table.descend(t, best, turn)
+        history += [(moves[best], board.play(moves[best]))]
+        path += [(t, best, bestCode, turn)]
+
+    # Each node gets the AMAF statistics of the moves played from it on
+    for t, best, bestCode, turn in reversed(path):
+        Table.update(t, best, res, turn)
         played.insert(0, bestCode)
-        for k in range(len(played)):
-            code = played[k]
-            seen = False
-            for j in range(k):
-                if played[j] == code:
-                    seen = True
-            if not seen:
-                t[3][code] += 1
-                t[4][code] += res
-        # played.insert(0, moves[best])
-        return res
-    else:
-        Table.addAMAF(board)
-        return board.playoutAMAF(played)
+        Table.updateAMAF(t, played, res)
+    return res
 
 
-
-def BestMoveRAVE(Table, board, n):    
-    for i in range(n):
-        b1 = copy.deepcopy(board)
-        _ = RAVE(Table, b1, [])
+def BestMoveRAVE(Table, board, n = None, time_ms = None):
+    budget = Budget(Table, n, time_ms)
+    while budget.running():
+        history = []
+        _ = RAVE(Table, board, [], history)
+        undo_all(board, history)
+        budget.spend()
     t = Table.look(board)
     moves = board.legalMoves()
     best = moves[0]
@@ -273,13 +355,17 @@ def BestMoveRAVE(Table, board, n):
 UCT
 """
 
-def UCT(Table, board, depth=0):
-    if board.terminal():
-        return board.score()
-    if depth >= sys.getrecursionlimit()-MAX_RECURSION_DELTA :
-        return board.score()
-    t = Table.look(board)
-    if t != None:
+def UCT(Table, board, history):
+    path = []
+    while True:
+        if board.terminal():
+            res = board.score()
+            break
+        t = Table.look(board)
+        if t == None:
+            Table.add(board)
+            res = board.playout(history)
+            break
         bestValue = -10000000.0
         best = 0
         moves = board.legalMoves()
@@ -293,21 +379,101 @@ def UCT(Table, board, depth=0):
             if val > bestValue :
                 bestValue = val
                 best = i
-        board.play(moves[best])
-        res = UCT(Table, board, depth+1)
-        t[0] += 1
-        t[1][best] += 1
-        t[2][best] += res
-        return res
-    else:
-        Table.add(board)
-        return board.playout()
+        turn = board.turn
+        Table.descend(t, best, turn)
+        history += [(moves[best], board.play(moves[best]))]
+        path += [(t, best, turn)]
+
+    for t, best, turn in reversed(path):
+        Table.update(t, best, res, turn)
+    return res
+
+def BestMoveUCT(Table, board, n = None, time_ms = None):
+    budget = Budget(Table, n, time_ms)
+    while budget.running():
+        history = []
+        _ = UCT(Table, board, history)
+        undo_all(board, history)
+        budget.spend()
+    t = Table.look(board)
+    moves = board.legalMoves()
+    best = moves[0]
+    bestValue = t[1][0]
+    for i in range(1, len(moves)):
+        if (t[1][i] > bestValue):
+            bestValue = t[1][i]
+            best = moves[i]
+    return best
+
+
+
+"""
+Root parallel UCT, GRAVE and RAVE
+"""
+
+_executors = {}
+
+def shutdownExecutors():
+    '''
+    Stops the process pools of the parallel searches. A process exits only once its child processes are over,
+    so a tournament worker that played parallel bots would wait for their pools forever
+    '''
+    for executors in (_executors, _tree_executors):
+        for executor in executors.values():
+            executor.shutdown()
+        executors.clear()
+
+def newExecutor(workers, **kwargs):
+    '''
+    Process pool stopped when this process exits, before multiprocessing waits for the child processes.
+    The priority is above the one of the queues of the pool, that must still be open to stop it
+    '''
+    if not _executors and not _tree_executors:
+        Finalize(None, shutdownExecutors, exitpriority = 100)
+    return ProcessPoolExecutor(workers, **kwargs)
+
+def getExecutor(workers):
+    '''
+    Pool of worker processes, created once for each number of workers and kept for the next moves
+    '''
+    if not workers in _executors:
+        _executors[workers] = newExecutor(workers)
+    return _executors[workers]
 
-def BestMoveUCT(Table, board, n):    
-    for i in range(n):
-        b1 = copy.deepcopy(board)
-        _ = UCT(Table, b1)
+def rootSearch(job):
+    '''
+    Work of one process: a tree built from the root with its own seed, in a table built from the spec of the parent's.
+    Returns its simulations, the positions it added and the root entry
+    '''
+    search, (table_class, kwargs), constants, board, n, time_ms, seed = job
+    for k, v in constants.items():
+        setattr(table_class, k, v)
+    np.random.seed(seed)
+    Table = table_class(**kwargs)
+    search(Table, board, n, time_ms)
+    return Table.simulations, Table.inserts, Table.searched(board)
+
+def rootParallel(search, Table, board, n, time_ms, workers, amaf):
+    '''
+    Runs search in 'workers' processes from the same root and adds their root statistics in the root entry of Table.
+    Table counts the simulations and the positions added by the processes.
+    The n simulations are shared between the workers, while time_ms is the time of each of them
+    '''
+    constants = {k: getattr(Table.__class__, k) for k in ['MaxLegalMoves', 'MaxTotalLegalMoves', 'White', 'Black']}
+    jobs = []
+    for w in range(workers):
+        n_w = None if n is None else max(n // workers + (1 if w < n % workers else 0), 1)
+        jobs += [(search, Table.spec(), constants, board, n_w, time_ms, np.random.randint(2**31))]
+    if Table.look(board) is None:
+        if amaf:
+            Table.addAMAF(board)
+        else:
+            Table.add(board)
     t = Table.look(board)
+    for simulations, inserts, root in getExecutor(workers).map(rootSearch, jobs):
+        Table.merge(t, root)
+        Table.simulations += simulations
+        Table.inserts += inserts
     moves = board.legalMoves()
     best = moves[0]
     bestValue = t[1][0]
@@ -317,28 +483,157 @@ def BestMoveUCT(Table, board, n):
             best = moves[i]
     return best
 
+def BestMoveUCTRootParallel(Table, board, n = None, time_ms = None, workers = 4):
+    return rootParallel(BestMoveUCT, Table, board, n, time_ms, workers, amaf = False)
+
+def BestMoveGRAVERootParallel(Table, board, n = None, time_ms = None, workers = 4):
+    return rootParallel(BestMoveGRAVE, Table, board, n, time_ms, workers, amaf = True)
+
+def BestMoveRAVERootParallel(Table, board, n = None, time_ms = None, workers = 4):
+    return rootParallel(BestMoveRAVE, Table, board, n, time_ms, workers, amaf = True)
+
+"""
+Tree parallel UCT, GRAVE and RAVE
+"""
+
+# Process pools of the tree parallel searches, by number of workers. Their processes share the locks of the table entries
+_tree_executors = {}
+
+def getTreeExecutor(workers, Table):
+    if not workers in _tree_executors:
+        _tree_executors[workers] = newExecutor(workers, initializer = Table.share_locks, initargs = (Table.new_locks(),))
+    return _tree_executors[workers]
+
+def treeSearch(job):
+    '''
+    Work of one process: simulations on the shared tree with its own seed. Returns its simulations and the positions it added
+    '''
+    search, Table, board, n, time_ms, seed = job
+    np.random.seed(seed)
+    try:
+        search(Table, board, n, time_ms)
+        return Table.simulations, Table.inserts
+    finally:
+        Table.release()
+
+def treeParallel(search, Table, board, n, time_ms, workers, amaf, capacity):
+    '''
+    Runs search in 'workers' processes on one tree, stored in the shared table given by Table.shared.
+    Unless Table is itself shared, the tree is dropped after the move, even if a worker fails, and Table only counts the simulations and the positions added.
+    Without capacity, the shared table has two slots per simulation, or fewer if the shared memory is short.
+    The n simulations are shared between the workers, while time_ms is the time of each of them
+    '''
+    shared = Table.shared(capacity, amaf, None if n is None else n + 1)
+    try:
+        if shared.look(board) is None:
+            if amaf:
+                shared.addAMAF(board)
+            else:
+                shared.add(board)
+        jobs = []
+        for w in range(workers):
+            n_w = None if n is None else max(n // workers + (1 if w < n % workers else 0), 1)
+            jobs += [(search, shared, board, n_w, time_ms, np.random.randint(2**31))]
+        if not shared is Table:
+            # The root, added here
+            Table.inserts += shared.inserts
+        for simulations, inserts in getTreeExecutor(workers, shared).map(treeSearch, jobs):
+            Table.simulations += simulations
+            Table.inserts += inserts
+        t = shared.look(board)
+        moves = board.legalMoves()
+        best = moves[0]
+        bestValue = t[1][0]
+        for i in range(1, len(moves)):
+            if (t[1][i] > bestValue):
+                bestValue = t[1][i]
+                best = moves[i]
+        del t
+    finally:
+        if not shared is Table:
+            shared.release()
+    return best
+
+def BestMoveUCTTreeParallel(Table, board, n = None, time_ms = None, workers = 4, capacity = None):
+    return treeParallel(BestMoveUCT, Table, board, n, time_ms, workers, amaf = False, capacity = capacity)
+
+def BestMoveGRAVETreeParallel(Table, board, n = None, time_ms = None, workers = 4, capacity = None):
+    return treeParallel(BestMoveGRAVE, Table, board, n, time_ms, workers, amaf = True, capacity = capacity)
 
+def BestMoveRAVETreeParallel(Table, board, n = None, time_ms = None, workers = 4, capacity = None):
+    return treeParallel(BestMoveRAVE, Table, board, n, time_ms, workers, amaf = True, capacity = capacity)
 
 """
 Flat Monte Carlo
 """
 
-def flat (Table, board, n):
+def flat (Table, board, n = None, time_ms = None):
+    '''
+    With n, each move gets n // (number of moves) playouts. With a time budget, the moves take turns until the time is over
+    '''
+    budget = Budget(Table, n, time_ms)
     moves = board.legalMoves ()
+    M = len(moves)
+    if budget.deadline is None:
+        schedule = [m for m in range (M) for i in range (n//M)]
+    else:
+        schedule = cycle(range (M))
+    s = [0.0 for m in range (M)]
+    visits = [0 for m in range (M)]
+    for m in schedule:
+        if not budget.running():
+            break
+        history = [(moves [m], board.play (moves [m]))]
+        r = board.playout (history)
+        undo_all(board, history)
+        if board.turn == Table.__class__.Black:
+            r = 1 - r
+        s [m] += r
+        visits [m] += 1
+        budget.spend()
     bestScore = 0
     bestMove = moves [0]
+    for m in range (M):
+        if visits [m] > 0 and s [m] / visits [m] > bestScore:
+            bestScore = s [m] / visits [m]
+            bestMove = moves [m]
+    return bestMove
+
+def flat_batch (Table, board, n = None, time_ms = None, batch = 256):
+    '''
+    Flat Monte Carlo where the playouts of each move are played together with board.batchPlayout.
+    With a time budget, the moves take turns playing at most 'batch' playouts until the time is over:
+    as many as fit in the time left at the speed of the playouts so far, and 16 for the first move, to measure it
+    '''
+    budget = Budget(Table, n, time_ms)
+    moves = board.legalMoves ()
     M = len(moves)
+    if budget.deadline is None:
+        schedule, size = range (M), max(n//M, 1)
+    else:
+        schedule, size = cycle(range (M)), min(batch, 16)
+    start = time.perf_counter()
+    s = [0.0 for m in range (M)]
+    visits = [0 for m in range (M)]
+    for m in schedule:
+        if not budget.running():
+            break
+        if not budget.deadline is None and budget.done > 0:
+            now = time.perf_counter()
+            size = min(batch, max(int((budget.deadline - now) * budget.done / (now - start)), 1))
+        history = [(moves [m], board.play (moves [m]))]
+        r = board.batchPlayout (size)
+        undo_all(board, history)
+        if board.turn == Table.__class__.Black:
+            r = 1 - r
+        s [m] += r.sum()
+        visits [m] += size
+        budget.spend(size)
+    bestScore = -1
+    bestMove = moves [0]
     for m in range (M):
-        s = 0
-        for i in range (n//M):
-            b = copy.deepcopy (board)
-            b.play (moves [m])
-            r = b.playout ()
-            if board.turn == Table.__class__.Black:
-                r = 1 - r
-            s = s + r
-        if s > bestScore:
-            bestScore = s
+        if visits [m] > 0 and s [m] / visits [m] > bestScore:
+            bestScore = s [m] / visits [m]
             bestMove = moves [m]
     return bestMove
 
@@ -348,11 +643,13 @@ def flat (Table, board, n):
 UCB
 """
 
-def UCB (Table, board, n):
+def UCB (Table, board, n = None, time_ms = None):
+    budget = Budget(Table, n, time_ms)
     moves = board.legalMoves ()
     sumScores = [0.0 for x in range (len (moves))]
     nbVisits = [0 for x in range (len(moves))]
-    for i in range (n):
+    while budget.running():
+        i = budget.done
         bestScore = 0
         bestMove = 0
         for m in range (len(moves)):
@@ -362,13 +659,14 @@ def UCB (Table, board, n):
             if score > bestScore:
                 bestScore = score
                 bestMove = m
-        b = copy.deepcopy (board)
-        b.play (moves [bestMove])
-        r = b.playout ()
+        history = [(moves [bestMove], board.play (moves [bestMove]))]
+        r = board.playout (history)
+        undo_all(board, history)
         if board.turn == Table.__class__.Black:
             r = 1.0 - r
         sumScores [bestMove] += r
         nbVisits [bestMove] += 1
+        budget.spend()
     bestScore = 0
     bestMove = moves [0]
     for m in range (len(moves)):
@@ -382,14 +680,14 @@ def UCB (Table, board, n):
 Random player
 """
 
-def random_bot(Table, board):
+def random_bot(Table, board, n = None, time_ms = None):
     return np.random.choice(board.legalMoves ())
 
 """
 Same move player
 """
 
-def same_move(Table, board):
+def same_move(Table, board, n = None, time_ms = None):
     return board.legalMoves ()[0]
 
 
@@ -402,7 +700,14 @@ bots = {'UCT': BestMoveUCT,
         'RAVE': BestMoveRAVE,
         'SHUSS': SHUSS,
         'SH': SequentialHalving,
+        'UCT root-parallel': BestMoveUCTRootParallel,
+        'GRAVE root-parallel': BestMoveGRAVERootParallel,
+        'RAVE root-parallel': BestMoveRAVERootParallel,
+        'UCT tree-parallel': BestMoveUCTTreeParallel,
+        'GRAVE tree-parallel': BestMoveGRAVETreeParallel,
+        'RAVE tree-parallel': BestMoveRAVETreeParallel,
         'Flat MC': flat,
+        'Flat MC batch': flat_batch,
         'Random': random_bot,
         'Dumb': same_move}
 
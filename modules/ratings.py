@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+"""
+Ratings of the bots from their games: Elo updated game by game, and Bradley-Terry ratings fitted on a whole history.
+Run from the modules folder to rate a history file: python ratings.py --help
+"""
+
+import numpy as np
+import csv
+from argparse import ArgumentParser, ArgumentDefaultsHelpFormatter
+
+# Logistic scale of the Elo ratings: 400 points of difference are odds of 10 to 1
+SCALE = np.log(10) / 400
+
+
+def p(D):
+    '''
+    Expected score of a bot rated D points above its opponent
+    '''
+    return 1.0/(1.0 + 10.0**(-D/400))
+
+def K(nb_played):
+    if nb_played < 10:
+        return 40
+    elif 10 <= nb_played < 20:
+        return 30
+    else:
+        return 20
+
+def elo_update(elo1, elo2, played1, played2, W):
+    '''
+    New Elo ratings of two bots after a game. W = 1 if bot 1 wins, 0.5 for a draw, 0 if bot 2 wins.
+    played1 and played2 are their numbers of games before this one
+    '''
+    D = elo1 - elo2
+    return int(elo1 + K(played1)*(W - p(D))), int(elo2 + K(played2)*(1.0 - W - p(-D)))
+
+
+class BradleyTerry(object):
+    '''
+    Maximum likelihood ratings of a history of games: the expected score of White is p(elo[white] - elo[black] + advantage).
+    The fit is a Newton method on the counts of games and points of each (white, black) pair, so its cost does not depend on the number of games.
+    A normal prior of standard deviation prior_sd on the ratings and the advantage keeps them finite for bots that never lost or never won,
+    and centers the ratings on mean. stderr are the standard errors of the ratings minus their mean, from the curvature of the likelihood at the fit
+    '''
+    def __init__(self, white, black, scores, names = None, advantage = True, prior_sd = 1000.0, mean = 1200.0, iterations = 100, tol = 1e-9):
+        if names is None:
+            names = sorted(set(white) | set(black))
+        self.names = list(names)
+        index = {name: i for i, name in enumerate(self.names)}
+        played = [k for k, s in enumerate(scores) if not s is None]
+        w = np.array([index[white[k]] for k in played], dtype = int)
+        b = np.array([index[black[k]] for k in played], dtype = int)
+        s = np.array([scores[k] for k in played], dtype = float)
+        n = len(self.names)
+        self.games = len(played)
+
+        # Games and points of White for each pair
+        N = np.zeros((n, n))
+        S = np.zeros((n, n))
+        np.add.at(N, (w, b), 1)
+        np.add.at(S, (w, b), s)
+        i, j = np.nonzero(N)
+        N, S = N[i, j], S[i, j]
+        # Each pair changes the score of White through elo[i] - elo[j] + advantage
+        X = np.zeros((len(i), n + 1))
+        X[np.arange(len(i)), i] = 1
+        X[np.arange(len(i)), j] -= 1
+        X[:, n] = 1 if advantage else 0
+        prior = np.full(n + 1, 1.0 / prior_sd**2)
+        if not advantage:
+            prior[n] = 1
+
+        theta = np.zeros(n + 1)
+        for _ in range(iterations):
+            q = 1.0 / (1.0 + np.exp(-SCALE * (X @ theta)))
+            grad = SCALE * X.T @ (S - N * q) - prior * theta
+            info = SCALE**2 * (X.T * (N * q * (1 - q))) @ X + np.diag(prior)
+            step = np.linalg.solve(info, grad)
+            theta += step
+            if np.max(np.abs(step)) < tol:
+                break
+        cov = np.linalg.inv(info)
+        # Only differences of ratings are measured: the errors are those of the ratings minus their mean
+        center = np.eye(n + 1)
+        center[:n, :n] -= 1.0 / n
+        cov = center @ cov @ center.T
+
+        self.elo = mean + theta[:n]
+        self.stderr = np.sqrt(np.diag(cov)[:n])
+        self.advantage = theta[n] if advantage else 0.0
+        self.advantage_stderr = np.sqrt(cov[n, n]) if advantage else 0.0
+
+    def interval(self, z = 1.96):
+        '''
+        Lower and upper bounds of the ratings, 95% confidence intervals by default
+        '''
+        return self.elo - z * self.stderr, self.elo + z * self.stderr
+
+    def rows(self, z = 1.96):
+        '''
+        One dict per bot, from the highest rating to the lowest
+        '''
+        low, high = self.interval(z)
+        order = np.argsort(-self.elo)
+        return [{'bot': self.names[k], 'elo': round(float(self.elo[k]), 1), 'stderr': round(float(self.stderr[k]), 1),
+                 'low': round(float(low[k]), 1), 'high': round(float(high[k]), 1)} for k in order]
+
+    def to_csv(self, path, z = 1.96):
+        rows = self.rows(z)
+        with open(path, 'w', newline = '') as f:
+            writer = csv.DictWriter(f, fieldnames = list(rows[0].keys()))
+            writer.writeheader()
+            writer.writerows(rows)
+
+    def __repr__(self):
+        lines = ["{:<30} {:>8} {:>17}".format("bot", "elo", "95%")]
+        for row in self.rows():
+            lines += ["{:<30} {:>8.1f} [{:>7.1f}, {:>7.1f}]".format(row['bot'], row['elo'], row['low'], row['high'])]
+        lines += ["White advantage {:.1f} +- {:.1f}, {} games".format(self.advantage, 1.96 * self.advantage_stderr, self.games)]
+        return '\n'.join(lines)
+
+
+def read_history(path):
+    '''
+    White, Black and score of White of the games in a matches_history csv written by tournament.py
+    '''
+    white, black, scores = [], [], []
+    with open(path, newline = '') as f:
+        for row in csv.DictReader(f):
+            white += [row['White']]
+            black += [row['Black']]
+            if row['Winner'] == row['White']:
+                scores += [1.0]
+            elif row['Winner'] == row['Black']:
+                scores += [0.0]
+            else:
+                scores += [None]
+    return white, black, scores
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(formatter_class=ArgumentDefaultsHelpFormatter)
+    parser.add_argument("history", help="matches_history csv file written by tournament.py")
+    parser.add_argument("--out", help="csv file to save the ratings in", default=None)
+    parser.add_argument("--prior_sd", help="Standard deviation of the prior of the ratings, in Elo", default=1000)
+    args = parser.parse_args()
+    fit = BradleyTerry(*read_history(args.history), prior_sd = float(args.prior_sd))
+    print(fit)
+    if not args.out is None:
+        fit.to_csv(args.out)
@@ -0,0 +1,252 @@
+# -*- coding: utf-8 -*-
+"""
+Tournament results, written game by game
+"""
+
+import csv
+import json
+import os
+from ratings import elo_update
+
+HISTORY_COLUMNS = ["datetime", "White", "Black", "Winner", "Elo White Before", "Elo Black Before", "Elo White After", "Elo Black After"]
+GAME_COLUMNS = ['white_bot', 'black_bot', 'score', 'time']
+SPRT_COLUMNS = ['game', 'A', 'B', 'wins', 'losses', 'llr', 'lower', 'upper', 'status']
+MOVE_COLUMNS = ['game', 'bot', 'color', 'move', 'wall', 'cpu', 'simulations', 'nodes', 'playouts_per_s']
+# Keys of the stats() of every table class: T_Table, FixedTable and SharedTable, and BookTable. A table leaves the others empty
+TABLE_COLUMNS = ['game', 'bot', 'color', 'move', 'nodes', 'hits', 'misses', 'hit_rate', 'inserts', 'bytes', 'simulations',
+                 'capacity', 'collisions', 'replaced', 'dropped', 'priors']
+
+
+class ResultsWriter(object):
+    '''
+    Appends rows to a CSV file, one at a time. The header is written only if the file is new or empty.
+    Columns missing from a row are left empty, keys that are not columns raise a ValueError.
+    Each row is flushed, so the file holds every finished game if the run stops
+    '''
+    def __init__(self, path, columns):
+        self.path = path
+        new = not os.path.exists(path) or os.path.getsize(path) == 0
+        self.file = open(path, 'a', newline = '')
+        self.writer = csv.DictWriter(self.file, fieldnames = columns, restval = '')
+        if new:
+            self.writer.writeheader()
+
+    def write(self, row):
+        self.writer.writerow(row)
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def write_rows(path, rows):
+    '''
+    Writes the dicts in rows as a csv file, with the keys of the first one as columns
+    '''
+    with open(path, 'w', newline = '') as f:
+        writer = csv.DictWriter(f, fieldnames = list(rows[0].keys()))
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def summarize_moves(path):
+    '''
+    Totals and means per bot of a moves csv written with MOVE_COLUMNS. Playouts per second are those of the whole time of the bot.
+    CPU time is the one of the process that played the game, without the processes of parallel searches
+    '''
+    totals = {}
+    if not os.path.exists(path):
+        return []
+    with open(path, newline = '') as f:
+        for row in csv.DictReader(f):
+            t = totals.setdefault(row['bot'], {'moves': 0, 'wall': 0.0, 'cpu': 0.0, 'simulations': 0, 'nodes': 0})
+            t['moves'] += 1
+            t['wall'] += float(row['wall'])
+            t['cpu'] += float(row['cpu'])
+            t['simulations'] += int(row['simulations'])
+            t['nodes'] += int(row['nodes'])
+    rows = []
+    for bot, t in totals.items():
+        rows += [{'bot': bot, 'moves': t['moves'], 'wall': t['wall'], 'cpu': t['cpu'], 'simulations': t['simulations'], 'nodes': t['nodes'],
+                  'wall_per_move': t['wall'] / t['moves'], 'cpu_per_move': t['cpu'] / t['moves'],
+                  'simulations_per_move': t['simulations'] / t['moves'], 'nodes_per_move': t['nodes'] / t['moves'],
+                  'playouts_per_s': t['simulations'] / t['wall'] if t['wall'] > 0 else 0.0,
+                  'playouts_per_cpu_s': t['simulations'] / t['cpu'] if t['cpu'] > 0 else 0.0}]
+    return rows
+
+
+def file_sizes(paths):
+    '''
+    Size in bytes of the files of paths, a dict of names and paths, by name. 0 for those that do not exist
+    '''
+    return {name: os.path.getsize(path) if os.path.exists(path) else 0 for name, path in paths.items()}
+
+
+def truncate_files(paths, sizes):
+    '''
+    Cuts the files of paths back to their sizes given by file_sizes, removing what was written since
+    '''
+    for name, size in sizes.items():
+        path = paths[name]
+        if os.path.exists(path) and os.path.getsize(path) > size:
+            with open(path, 'r+b') as f:
+                f.truncate(size)
+
+
+class Standings(object):
+    '''
+    Elo, number of games and head-to-head record of the bots, updated one game at a time.
+    record[a][b] is [wins of a against b with White, wins of a against b with Black]
+    '''
+    def __init__(self, names, rating = 1200):
+        self.names = list(names)
+        self.elo = {name: rating for name in self.names}
+        self.played = {name: 0 for name in self.names}
+        self.record = {a: {b: [0, 0] for b in self.names} for a in self.names}
+
+    @classmethod
+    def read(cls, path, names):
+        '''
+        Standings saved in path by to_csv, if they have all the bots in names. New standings otherwise
+        '''
+        standings = cls(names)
+        if not os.path.exists(path):
+            return standings
+        with open(path, newline = '') as f:
+            rows = {row['bot']: row for row in csv.DictReader(f)}
+        if not all(a in rows and all(b in rows[a] for b in standings.names) for a in standings.names):
+            return standings
+        for a in standings.names:
+            standings.elo[a] = int(rows[a]['elo'])
+            standings.played[a] = int(rows[a]['nb_played'])
+            for b in standings.names:
+                standings.record[a][b] = [int(x) for x in rows[a][b].split('/')]
+        return standings
+
+    def update(self, white, black, res):
+        '''
+        Adds the game of bots white and black, with result res for White. Returns its row of the history
+        '''
+        hist = {"White": white, "Black": black,
+                "Elo White Before": self.elo[white], "Elo Black Before": self.elo[black]}
+        if res == 1.0 or res == 0:
+            if res == 1.0:
+                self.record[white][black][0] += 1
+                hist["Winner"] = white
+            else:
+                self.record[black][white][1] += 1
+                hist["Winner"] = black
+            self.elo[white], self.elo[black] = elo_update(self.elo[white], self.elo[black], self.played[white], self.played[black], res)
+            self.played[white] += 1
+            self.played[black] += 1
+        else:
+            hist["Winner"] = "Error"
+        hist["Elo White After"] = self.elo[white]
+        hist["Elo Black After"] = self.elo[black]
+        return hist
+
+    def to_csv(self, path):
+        '''
+        Writes the table of the bots: elo, nb_played and one column per opponent. The file is replaced at once
+        '''
+        tmp = path + '.tmp'
+        with open(tmp, 'w', newline = '') as f:
+            writer = csv.writer(f)
+            writer.writerow(["bot", "elo", "nb_played"] + self.names)
+            for a in self.names:
+                writer.writerow([a, self.elo[a], self.played[a]] + ["/".join(map(str, self.record[a][b])) for b in self.names])
+        os.replace(tmp, path)
+
+    def to_dict(self):
+        return {'names': self.names, 'elo': self.elo, 'played': self.played, 'record': self.record}
+
+    @classmethod
+    def from_dict(cls, d):
+        standings = cls(d['names'])
+        standings.elo, standings.played, standings.record = d['elo'], d['played'], d['record']
+        return standings
+
+
+class Schedule(object):
+    '''
+    Games of a tournament and their status, kept in a JSON lines file to resume the tournament if the run stops.
+    The first line describes the tournament, then each game has a line with its pairing, colors, seed and status 'pending'.
+    When a game is done, a line with its number, status 'done', score and time is appended, or status 'skipped' if it will not be played.
+    The first line and the done lines can also hold the sizes of the output files once the game was written: sizes are the last ones,
+    so that truncate_files removes the rows of a game whose done line was never written
+    '''
+    def __init__(self, path, info, games):
+        self.path = path
+        self.info = info
+        self.games = games
+        self.sizes = info.get('sizes', {})
+        self.file = open(path, 'a')
+        # A line cut by the end of the last run is left on its own
+        if self.file.tell() > 0:
+            with open(path, 'rb') as f:
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b'\n':
+                    self.file.write('\n')
+
+    @classmethod
+    def create(cls, path, info, games):
+        '''
+        Writes a new schedule in path, replacing any previous one
+        '''
+        tmp = path + '.tmp'
+        with open(tmp, 'w') as f:
+            for line in [info] + games:
+                f.write(json.dumps(line) + '\n')
+        os.replace(tmp, path)
+        return cls(path, info, games)
+
+    @classmethod
+    def read(cls, path):
+        lines = []
+        with open(path) as f:
+            for line in f:
+                try:
+                    lines += [json.loads(line)]
+                except ValueError:
+                    pass
+        info, games = lines[0], []
+        sizes = info.get('sizes', {})
+        for line in lines[1:]:
+            if line['status'] == 'pending':
+                games += [line]
+            else:
+                sizes = line.pop('sizes', sizes)
+                games[line['game']].update(line)
+        schedule = cls(path, info, games)
+        schedule.sizes = sizes
+        return schedule
+
+    def done(self, game, score, time, sizes = None):
+        line = {'game': game, 'status': 'done', 'score': score, 'time': time}
+        self.games[game].update(line)
+        if not sizes is None:
+            self.sizes = sizes
+            line['sizes'] = sizes
+        self.file.write(json.dumps(line) + '\n')
+        self.file.flush()
+
+    def skip(self, game):
+        '''
+        Marks a game that will not be played, like those of a pair whose SPRT is over
+        '''
+        line = {'game': game, 'status': 'skipped'}
+        self.games[game].update(line)
+        self.file.write(json.dumps(line) + '\n')
+        self.file.flush()
+
+    def pending(self):
+        return [g for g in self.games if g['status'] == 'pending']
+
+    def close(self):
+        self.file.close()
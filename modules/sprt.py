@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+"""
+Sequential probability ratio test, to stop a match between two bots as soon as one is known to be stronger
+"""
+
+import math
+from ratings import p
+
+
+class SPRT(object):
+    '''
+    Test of H0: bot A is elo0 points stronger than bot B, against H1: A is elo1 points stronger, on the games won by each.
+    alpha is the probability of accepting H1 when H0 holds, beta the one of accepting H0 when H1 holds.
+    Games without a winner are not counted. llrs holds the log-likelihood ratio after each game
+    '''
+    def __init__(self, elo0 = 0, elo1 = 20, alpha = 0.05, beta = 0.05):
+        self.elo0, self.elo1 = elo0, elo1
+        p0, p1 = p(elo0), p(elo1)
+        # Change of the log-likelihood ratio for a win and a loss of A
+        self.win = math.log(p1 / p0)
+        self.loss = math.log((1.0 - p1) / (1.0 - p0))
+        self.lower = math.log(beta / (1.0 - alpha))
+        self.upper = math.log((1.0 - beta) / alpha)
+        self.wins = 0
+        self.losses = 0
+        self.llr = 0.0
+        self.llrs = []
+
+    def add(self, score):
+        '''
+        Adds a game with score 1 if A won, 0 if B won
+        '''
+        if score == 1:
+            self.wins += 1
+            self.llr += self.win
+        elif score == 0:
+            self.losses += 1
+            self.llr += self.loss
+        self.llrs += [self.llr]
+
+    def status(self):
+        '''
+        'H1' once A is shown elo1 stronger, 'H0' once it is shown at most elo0 stronger, None while the test goes on
+        '''
+        if self.llr >= self.upper:
+            return 'H1'
+        if self.llr <= self.lower:
+            return 'H0'
+        return None
+
+    def __repr__(self):
+        return "LLR {:.3f} in [{:.3f}, {:.3f}], {} wins, {} losses".format(self.llr, self.lower, self.upper, self.wins, self.losses)
@@ -1,17 +1,24 @@
-import pandas as pd
 import play_functions as PLAYERS
 import onitama as GAME
 from itertools import combinations, cycle, count
 import transposition_table as T
 import time
-import elo
-from random import shuffle
+from results import ResultsWriter, Standings, Schedule, summarize_moves, write_rows, file_sizes, truncate_files, HISTORY_COLUMNS, GAME_COLUMNS, SPRT_COLUMNS, MOVE_COLUMNS, TABLE_COLUMNS
+from sprt import SPRT
+from ratings import BradleyTerry
+from game_records import GameWriter
+from job_queue import JobQueue, work
+from multiprocessing import Process
+import atexit
+import random
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from collections import deque
 import os
 import sys
 from argparse import ArgumentParser, ArgumentDefaultsHelpFormatter
 from datetime import datetime
 import json
-pd.options.mode.chained_assignment = None  # default='warn'
 
 # %% Set transposition table info here
 White = GAME.White
@@ -32,29 +39,92 @@ def parseInputs():
   parser = ArgumentParser(formatter_class=ArgumentDefaultsHelpFormatter)
   parser.add_argument("--out_path", help="Path to dump the output files with the results", default='../data')
   parser.add_argument("--verbose", help="Controls console output. true or false", default='false')
-  parser.add_argument("--save_at_each", help="Choose to save the results after every match. If false, saves only at the end of the tournament", default='true')
+  parser.add_argument("--save_at_each", help="Choose to save the bots table after every match. If false, saves it only at the end of the tournament. The games are always written as they end", default='true')
   parser.add_argument("--rounds", help="Number of rounds each pair of bots will play (two games per round, home and away)", default=2)
   bot_options = ', '.join(bot_dict.keys())
   parser.add_argument("--bots", help=f"JSON file containing the tournaments and the bots involved. The options for the bots are {bot_options}. See \bot_fights\tournament_example.json for an example.", default="../bot_fights/tournament_example.json")
-  parser.add_argument("--max_recur", help="Max recursion allowed for the recursive algorithms", default=200)
+  engine_options = ', '.join(GAME.engines.keys())
+  parser.add_argument("--table_stats", help="Save the transposition table statistics of every move in table_stats_<tournament>_<date>.csv. true or false", default='false')
+  parser.add_argument("--engine", help=f"Game engine used to play the matches. Options are {engine_options}", default="bitboard")
+  parser.add_argument("--workers", help="Number of processes playing games at the same time. Results are applied in the order of the schedule, as in a run with 1 worker. With --queue, number of local workers of the queue, 0 to leave all the games to workers started with job_queue.py", default=1)
+  parser.add_argument("--queue", help="SQLite file through which the games are handed to workers, on this machine or others: python job_queue.py --queue <file>. Games of a resumed tournament already done there are not played again", default=None)
+  parser.add_argument("--seed", help="Seed of the schedule and of the games. Each game gets its own seed from it, so the results do not depend on --workers. Random if not given", default=None)
+  parser.add_argument("--sprt", help="Stop each pair of bots once a sequential probability ratio test decides between elo0 and elo1, --rounds being the maximum. The first bot of the pair in the json file is bot A. true or false", default='false')
+  parser.add_argument("--elo0", help="Elo difference of bot A over bot B under H0, for --sprt", default=0)
+  parser.add_argument("--elo1", help="Elo difference of bot A over bot B under H1, for --sprt", default=20)
+  parser.add_argument("--alpha", help="Probability of accepting H1 when H0 holds, for --sprt", default=0.05)
+  parser.add_argument("--beta", help="Probability of accepting H0 when H1 holds, for --sprt", default=0.05)
+  parser.add_argument("--suite", help="Number of card deals, drawn with --seed among the 30 deals of each of the 4368 card sets, that each pair plays twice with colors swapped, instead of --rounds. 'all' for every deal. 0 for a random deal per game", default=0)
+  parser.add_argument("--records", help="Save the cards and moves of every game in the binary file games_<tournament>_<date>.onigames, read by game_records.py. true or false", default='true')
+  parser.add_argument("--resume", help="Continue the tournaments from their schedule_<tournament>.jsonl file in out_path, skipping the games already done. true or false", default='false')
   args = parser.parse_args()
   return args
 
 
 class Bot:
 
-    def __init__(self, name, play_func, **kwargs):
+    def __init__(self, name, play_func, reuse_tree = False, table_capacity = None, book = None, **kwargs):
         self.name = name
         self.play_func = play_func        
         self.params = kwargs
-        
+        # Keep the transposition table between the moves of a game
+        self.reuse_tree = reuse_tree
+        # Number of slots of a FixedTable. None for an unbounded T_Table
+        self.table_capacity = table_capacity
+        # Folder of the PersistentTable files, one per card draw. The bot starts from their statistics and adds its own after each game
+        self.book = book
+        self.Table = None
+        # Table statistics after each move, if log_tables
+        self.log_tables = False
+        self.table_log = []
+        # Time and work of each move
+        self.move_log = []
+
+    def new_game(self):
+        self.Table = None
+
+    def end_game(self):
+        if not self.book is None and not self.Table is None:
+            self.Table.flush()
+
+    def new_table(self, board):
+        if not self.book is None:
+            os.makedirs(self.book, exist_ok = True)
+            return T.PersistentTable(os.path.join(self.book, '-'.join(board.chosen_cards) + '.ttable'))
+        if self.table_capacity is None:
+            return T.T_Table()
+        return T.FixedTable(int(self.table_capacity))
 
     def play(self, board):
-        Table = T.T_Table()
-        return self.play_func(board=board, Table=Table, **self.params)
+        if self.Table is None:
+            self.Table = self.new_table(board)
+        elif self.reuse_tree:
+            self.Table.prune(board)
+        elif not self.book is None:
+            # Keeps the statistics of the last move for the book
+            self.Table.clear()
+        else:
+            self.Table = self.new_table(board)
+        simulations, inserts = self.Table.simulations, self.Table.inserts
+        wall, cpu = time.perf_counter(), time.process_time()
+        move = self.play_func(board=board, Table=self.Table, **self.params)
+        wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+        simulations = self.Table.simulations - simulations
+        self.move_log += [dict(wall = wall, cpu = cpu, simulations = simulations, nodes = self.Table.inserts - inserts,
+                               playouts_per_s = simulations / wall if wall > 0 else 0.0)]
+        if self.log_tables:
+            self.table_log += [self.Table.stats()]
+        return move
 
-def bot1_vs_bot2(white_bot, black_bot, verbose = False):
-    board= GAME.Board()
+def bot1_vs_bot2(white_bot, black_bot, verbose = False, board_class = GAME.BitBoard, cards = None, record = None):
+    '''
+    Plays a game and returns its score. If record is a dict, its 'cards' are set to the cards of the game and the Move.code of each move is added to its 'moves'
+    '''
+    board= board_class(cards)
+    if not record is None:
+        record['cards'] = [str(name) for name in board.chosen_cards]
+    white_bot.new_game()
+    black_bot.new_game()
     loading = cycle(["-","/","|","\\"])
     num_moves = count(0,1)
     while (True):
@@ -64,13 +134,76 @@ def bot1_vs_bot2(white_bot, black_bot, verbose = False):
             sys.stdout.write('\rRunning {}, Total moves: {:05d}'.format(c, cont))
             sys.stdout.flush()
         if board.terminal():
+            white_bot.end_game()
+            black_bot.end_game()
             return board.score()
         if board.turn == White:
-            board.play(white_bot.play(board))
+            move = white_bot.play(board)
         else:
-            board.play (black_bot.play(board))
+            move = black_bot.play(board)
+        if not record is None:
+            record['moves'] += [move.code(board)]
+        board.play(move)
         
 
+def game_seed(seed, index):
+  '''
+  Seed of game number index of a tournament played with seed
+  '''
+  return int(np.random.SeedSequence([seed, index]).generate_state(1)[0])
+
+
+def play_game(job):
+  '''
+  Plays one game of the schedule from its seed. With several workers, it runs in another process on copies of the bots.
+  Returns the result (None if the game failed), the process time, the table logs and the move logs of the bots, and the record of the game
+  '''
+  white_bot, black_bot, seed, verbose, board_class, cards = job
+  np.random.seed(seed)
+  random.seed(seed)
+  white_bot.table_log, black_bot.table_log = [], []
+  white_bot.move_log, black_bot.move_log = [], []
+  record = {'cards': cards, 'moves': []}
+  start = time.process_time()
+  try:
+    res = bot1_vs_bot2(white_bot = white_bot, black_bot = black_bot, verbose = verbose, board_class = board_class, cards = cards, record = record)
+  except Exception as e:
+    print(e)
+    res = None
+  return res, time.process_time() - start, white_bot.table_log, black_bot.table_log, white_bot.move_log, black_bot.move_log, record
+
+
+def play_games(jobs, workers, keep = None):
+  '''
+  Results of play_game for the jobs, in their order, or None for job k if keep(k) is false when it would start.
+  With more than one worker, the games are played by a process pool, at most 2 * workers ahead of the last result given
+  '''
+  if keep is None:
+    keep = lambda k: True
+  if workers <= 1:
+    for k, job in enumerate(jobs):
+      yield play_game(job) if keep(k) else None
+    return
+  with ProcessPoolExecutor(workers) as executor:
+    window = deque()
+    k = 0
+    while k < len(jobs) or window:
+      while k < len(jobs) and len(window) < 2 * workers:
+        window.append(executor.submit(play_game, jobs[k]) if keep(k) else None)
+        k += 1
+      future = window.popleft()
+      yield None if future is None else future.result()
+
+
+def stop_workers(queue, workers):
+  '''
+  Closes the queue and stops the local workers, which may still play games of pairs decided by their SPRT
+  '''
+  queue.close()
+  for p in workers:
+    p.terminate()
+
+
 def res_status(res, white_bot, black_bot):
   if res == 1: return white_bot.name
   if res == 0: return black_bot.name
@@ -84,155 +217,249 @@ def bot_from_json_dict(info, bot_dict):
   return Bot(name, bot_dict[bot], **info)
   
 
-# Fichier bots.csv avec les elos et les wins
-def bots_df(BASE_PATH, all_bots, tournament):
-  path_b = os.path.join(BASE_PATH,"bots_{}.csv".format(tournament))
-  if not os.path.exists(path_b):
-    with open(path_b,'w+') as f:
-      f.close()
-    df = pd.DataFrame(columns = ["bot", "elo", "nb_played"] + [bot.name for bot in all_bots])
-    for i, bot in enumerate(all_bots):
-        df.loc[i] = [bot.name, 1200, 0] + ["0/0"]*len(all_bots)
-    df.set_index("bot", inplace=True)
-    if not os.path.exists(path_b):
-      with open(path_b,'w+') as f:
-        f.close()
-    df.to_csv(path_b)
-  else:
-    try:
-        df = pd.read_csv(path_b, index_col="bot")
-        for b in all_bots:
-            if not b in df.columns:
-                raise Exception('New bot. Reseting table')
-    except:
-        df = pd.DataFrame(columns = ["bot", "elo", "nb_played"] + [bot.name for bot in all_bots])
-        for i, bot in enumerate(all_bots):
-            df.loc[i] = [bot.name, 1200, 0] + ["0/0"]*len(all_bots)
-        df.set_index("bot", inplace=True)
-        df.to_csv(path_b)
-  return df
-
-# Fichier matches_history.csv avec l'historique des parties
-def history_df(BASE_PATH, tournament):  
-  path_h = os.path.join(BASE_PATH,"matches_history_{}.csv".format(tournament))
-  if not os.path.exists(path_h):
-    with open(path_h, 'w+') as f:
-      f.close()
-    df_hist = pd.DataFrame(columns = ["datetime", "White", "Black", "Winner", "Elo White Before", "Elo Black Before", "Elo White After","Elo Black After"])
-    df_hist.to_csv(path_h)
-  else:
-    try:
-        df_hist = pd.read_csv(path_h)    
-    except:
-        df_hist = pd.DataFrame(columns = ["datetime", "White", "Black", "Winner", "Elo White Before", "Elo Black Before", "Elo White After","Elo Black After"])
-        df_hist.to_csv(path_h)
-  return df_hist
-
-
-
-
-# %% Parse arguments
-args = parseInputs()
-
-BASE_PATH = args.out_path
-VERBOSE = True if args.verbose=='true' else False
-SAVE_EACH = True if args.save_at_each=='true'else False
-ROUNDS = int(args.rounds)
-PRINT_LENGTH = 40
-FILL_CHAR = '-'
-TOURNAMENT_PATH = args.bots
-
-
-# %% Read json file with the tournaments to run
-with open(TOURNAMENT_PATH) as f:
-  content = json.load(f)
-tournaments = content['tournaments']
+def save_table_stats(writer, game, white_bot, black_bot):
+  '''
+  Writes the table statistics of each move of the game with writer, and empties the bots' logs
+  '''
+  for bot, color in [(white_bot, 'White'), (black_bot, 'Black')]:
+    for k, stats in enumerate(bot.table_log):
+      writer.write(dict(game = game, bot = bot.name, color = color, move = k, **stats))
+    bot.table_log = []
+
+
+def save_move_log(writer, game, white_bot, black_bot):
+  '''
+  Writes the time and work of each move of the game with writer, and empties the bots' logs
+  '''
+  for bot, color in [(white_bot, 'White'), (black_bot, 'Black')]:
+    for k, stats in enumerate(bot.move_log):
+      writer.write(dict(game = game, bot = bot.name, color = color, move = k, **stats))
+    bot.move_log = []
+
+def output_paths(base, tourn, dt_string):
+  '''
+  Files written game by game during a tournament
+  '''
+  return {'history': os.path.join(base,"matches_history_{}.csv".format(tourn)),
+          'games': os.path.join(base,"simple_table_{}.csv".format(dt_string)),
+          'moves': os.path.join(base,"moves_{}_{}.csv".format(tourn, dt_string)),
+          'table_stats': os.path.join(base,"table_stats_{}_{}.csv".format(tourn, dt_string)),
+          'records': os.path.join(base,"games_{}_{}.onigames".format(tourn, dt_string)),
+          'sprt': os.path.join(base,"sprt_{}_{}.csv".format(tourn, dt_string))}
 
 # %% main
 
+def main():
+  args = parseInputs()
 
+  BASE_PATH = args.out_path
+  VERBOSE = True if args.verbose=='true' else False
+  SAVE_EACH = True if args.save_at_each=='true'else False
+  ROUNDS = int(args.rounds)
+  PRINT_LENGTH = 40
+  FILL_CHAR = '-'
+  TOURNAMENT_PATH = args.bots
+  BOARD_CLASS = GAME.engines[args.engine]
+  TABLE_STATS = True if args.table_stats=='true' else False
+  WORKERS = int(args.workers)
+  SEED = random.randrange(2**31) if args.seed is None else int(args.seed)
+  RESUME = True if args.resume=='true' else False
+  SPRT_MODE = True if args.sprt=='true' else False
+  RECORDS = True if args.records=='true' else False
+  SUITE = None if args.suite=='all' else int(args.suite)
+  QUEUE = args.queue
 
-for tourn in tournaments:
-  format_key = "{{:{}^{}}}".format(FILL_CHAR, PRINT_LENGTH)
-  format_key_star = "{{:{}^{}}}".format("*", PRINT_LENGTH)
-  
-  if VERBOSE:
-    print("*"*PRINT_LENGTH)
-    print(format_key_star.format(" TOURNAMENT {} ".format(tourn)))
-    print("*"*PRINT_LENGTH)
-    print()
-  all_bots = [bot_from_json_dict(t, bot_dict) for t in tournaments[tourn]]
-  all_matches = list(combinations(all_bots, 2))
-  
-  df = bots_df(BASE_PATH, all_bots, tourn)
-  df_hist = history_df(BASE_PATH, tourn)
-  
-  simple_table = pd.DataFrame(columns = ['white_bot','black_bot', 'score','time'])
-  
-  dt_string = datetime.now().strftime("%Y_%m_%d_%H_%M_%S")
-  
-  counter = 0
-  path_b = os.path.join(BASE_PATH,"bots_{}.csv".format(tourn))
-  path_h = os.path.join(BASE_PATH,"matches_history_{}.csv".format(tourn))
-  for r in range(ROUNDS):
-      shuffle(all_matches)
+  if not QUEUE is None:
+    queue = JobQueue(QUEUE)
+    queue.open()
+    local_workers = [Process(target = work, args = (QUEUE, 0.1)) for _ in range(WORKERS)]
+    for p in local_workers:
+      p.start()
+    atexit.register(stop_workers, queue, local_workers)
+
+  # Read json file with the tournaments to run
+  with open(TOURNAMENT_PATH) as f:
+    content = json.load(f)
+  tournaments = content['tournaments']
+
+  for tourn in tournaments:
+    format_key = "{{:{}^{}}}".format(FILL_CHAR, PRINT_LENGTH)
+    format_key_star = "{{:{}^{}}}".format("*", PRINT_LENGTH)
+
+    if VERBOSE:
+      print("*"*PRINT_LENGTH)
+      print(format_key_star.format(" TOURNAMENT {} ".format(tourn)))
+      print("*"*PRINT_LENGTH)
+      print()
+    all_bots = [bot_from_json_dict(dict(t), bot_dict) for t in tournaments[tourn]]
+    # What a worker of the queue needs to build the bots again
+    specs = {bot.name: t for bot, t in zip(all_bots, tournaments[tourn])}
+    for bot in all_bots:
+      bot.log_tables = TABLE_STATS
+    all_matches = list(combinations(all_bots, 2))
+    names = [bot.name for bot in all_bots]
+    bots_by_name = {bot.name: bot for bot in all_bots}
+
+    path_b = os.path.join(BASE_PATH,"bots_{}.csv".format(tourn))
+    path_c = os.path.join(BASE_PATH,"schedule_{}.jsonl".format(tourn))
+
+    if RESUME and os.path.exists(path_c):
+      schedule = Schedule.read(path_c)
+      if sorted(schedule.info['bots']) != sorted(names):
+        raise Exception(f"The bots of tournament {tourn} are not those of {path_c}")
+      dt_string = schedule.info['datetime']
+      outputs = output_paths(BASE_PATH, tourn, dt_string)
+      # Rows of a game written before the run stopped, but not marked done in the schedule
+      truncate_files(outputs, schedule.sizes)
+      # Standings of the games already done, from those before the tournament
+      standings = Standings.from_dict(schedule.info['standings'])
+      for g in schedule.games:
+        if g['status'] == 'done':
+          standings.update(g['white'], g['black'], g['score'])
+    else:
+      dt_string = datetime.now().strftime("%Y_%m_%d_%H_%M_%S")
+      outputs = output_paths(BASE_PATH, tourn, dt_string)
+      # Elo ratings continue from the bots table if it has all the bots
+      standings = Standings.read(path_b, names)
+      # Each pair plays twice per round, home and away. In a suite, a round is a deal both games start from
+      rng = random.Random(SEED)
+      if SUITE == 0:
+        deals = [None] * ROUNDS
+      else:
+        deals = GAME.openings(SUITE, SEED)
+      planned = []
+      for r, cards in enumerate(deals):
+        rng.shuffle(all_matches)
+        for i, (bot1, bot2) in enumerate(all_matches):
+          for white_bot, black_bot in [(bot1, bot2), (bot2, bot1)]:
+            planned += [{'game': len(planned), 'round': r, 'match': i, 'white': white_bot.name, 'black': black_bot.name,
+                         'seed': game_seed(SEED, len(planned)), 'cards': cards, 'status': 'pending'}]
+      info = {'tournament': tourn, 'seed': SEED, 'rounds': len(deals), 'suite': SUITE != 0, 'bots': names, 'datetime': dt_string, 'standings': standings.to_dict(),
+              'sizes': file_sizes(outputs)}
+      schedule = Schedule.create(path_c, info, planned)
+
+    path_h, path_g, path_m, path_s = outputs['history'], outputs['games'], outputs['moves'], outputs['table_stats']
+    history = ResultsWriter(path_h, HISTORY_COLUMNS)
+    games = ResultsWriter(path_g, GAME_COLUMNS)
+    moves = ResultsWriter(path_m, MOVE_COLUMNS)
+    if TABLE_STATS:
+      table_stats = ResultsWriter(path_s, TABLE_COLUMNS)
+    if RECORDS:
+      records = GameWriter(outputs['records'])
+
+    # Sequential tests, by pair (A, B) with A first in the json file
+    pair = lambda g: tuple(sorted([g['white'], g['black']], key = names.index))
+    tests = {}
+    concluded = set()
+    if SPRT_MODE:
+      trajectory = ResultsWriter(outputs['sprt'], SPRT_COLUMNS)
+      for bot1, bot2 in combinations(names, 2):
+        tests[(bot1, bot2)] = SPRT(float(args.elo0), float(args.elo1), float(args.alpha), float(args.beta))
+      for g in schedule.games:
+        if g['status'] == 'done' and not g['score'] is None:
+          tests[pair(g)].add(g['score'] if g['white'] == pair(g)[0] else 1 - g['score'])
+          if g['game'] % 2 == 1 and not tests[pair(g)].status() is None:
+            concluded.add(pair(g))
+
+    todo = schedule.pending()
+    if VERBOSE and len(todo) < len(schedule.games):
+      print("Resuming after {} games done".format(len(schedule.games) - len(todo)))
+    jobs = [(bots_by_name[g['white']], bots_by_name[g['black']], g['seed'], VERBOSE and WORKERS <= 1, BOARD_CLASS, g.get('cards')) for g in todo]
+    keep = lambda k: not pair(todo[k]) in concluded
+    if QUEUE is None:
+      results = play_games(jobs, WORKERS, keep)
+    else:
+      payloads = [{'white': specs[g['white']], 'black': specs[g['black']], 'seed': g['seed'], 'cards': g.get('cards'),
+                   'engine': args.engine, 'log_tables': TABLE_STATS} for g in todo]
+      results = queue.run("{}_{}".format(tourn, dt_string), [g['game'] for g in todo], payloads, keep)
+
+    for g, result in zip(todo, results):
+      counter, r, i = g['game'], g['round'], g['match']
+      white_bot, black_bot = bots_by_name[g['white']], bots_by_name[g['black']]
+      if pair(g) in concluded:
+        # Played ahead by a worker, or never started
+        schedule.skip(counter)
+        continue
+      res, elapsed, white_bot.table_log, black_bot.table_log, white_bot.move_log, black_bot.move_log, record = result
       if VERBOSE:
-        print("*"*PRINT_LENGTH)
-        print(format_key_star.format(" ROUND {} ".format(r+1)))
-        print("*"*PRINT_LENGTH)
-      for i in range(len(all_matches)):
-          white_bot, black_bot = all_matches[i][0], all_matches[i][1]
-          if VERBOSE:          
-            print(format_key.format("  MATCH {} on {}  ".format(i + 1, len(all_matches))))  
-            print("-"*PRINT_LENGTH)
-            print(format_key.format("  MATCH {} VS {}  ".format(white_bot.name, black_bot.name)))
-            
-          start = time.process_time()
-          try:
-            res = bot1_vs_bot2(white_bot = white_bot, black_bot = black_bot, verbose = VERBOSE)
-          except Exception as e:
-            print(e)
-            res = None
-          
-          simple_table.loc[counter] = [white_bot.name, black_bot.name, res, time.process_time()-start]
-          counter += 1
-          if VERBOSE: 
-            print("\nWinner: {}".format(res_status(res,white_bot,black_bot)))
-          
-          hist = elo.updateTable(df, df_hist, white_bot, black_bot, res, dt_string)
-          df_hist = df_hist.append(hist, ignore_index = True)
-          white_bot, black_bot = all_matches[i][1], all_matches[i][0]
-          print()
-          if VERBOSE: 
-            print(format_key.format("  SWITCHING SIDES  "))
-          start = time.process_time()
-          try:
-            res = bot1_vs_bot2(white_bot = white_bot, black_bot = black_bot, verbose = VERBOSE)
-          except Exception as e:
-            print(e)
-            res = None
-          
-          
-          simple_table.loc[counter] = [white_bot.name, black_bot.name, res, time.process_time()-start]
-          counter += 1
-          if VERBOSE: 
-            print("\nWinner: {}".format(res_status(res,white_bot,black_bot)))
-        
-          hist = elo.updateTable(df, df_hist, white_bot, black_bot, res, dt_string)
-          df_hist = df_hist.append(hist, ignore_index = True)
-          
-          if SAVE_EACH:
-            df.to_csv(path_b)
-            df_hist.to_csv(path_h, index = False)
-          
-  
-  df.to_csv(path_b)
-  df_hist.to_csv(path_h, index = False)
-  path = os.path.join(BASE_PATH,"simple_table_{}.csv".format(dt_string))
-  if not os.path.exists(path):
-    with open(path,'w') as f:
-      f.close()
-  simple_table.to_csv(path, index = False)
-  
-  print(f"Tournament {tourn} is over. Results are available in {BASE_PATH}")
+        if counter % 2 == 0:
+          if i == 0:
+            print("*"*PRINT_LENGTH)
+            print(format_key_star.format(" ROUND {} ".format(r+1)))
+            print("*"*PRINT_LENGTH)
+            if not g.get('cards') is None:
+              print("Cards: {}".format(', '.join(g['cards'])))
+          print(format_key.format("  MATCH {} on {}  ".format(i + 1, len(all_matches))))
+          print("-"*PRINT_LENGTH)
+        else:
+          print(format_key.format("  SWITCHING SIDES  "))
+        print(format_key.format("  MATCH {} VS {}  ".format(white_bot.name, black_bot.name)))
+
+      games.write(dict(white_bot = white_bot.name, black_bot = black_bot.name, score = res, time = elapsed))
+      if TABLE_STATS:
+        save_table_stats(table_stats, counter, white_bot, black_bot)
+      save_move_log(moves, counter, white_bot, black_bot)
+      if RECORDS and not record['cards'] is None:
+        records.write(record['cards'], record['moves'], res)
+      if VERBOSE:
+        print("\nWinner: {}".format(res_status(res,white_bot,black_bot)))
+
+      hist = standings.update(white_bot.name, black_bot.name, res)
+      history.write(dict(hist, datetime = dt_string))
+
+      if SPRT_MODE:
+        A, B = pair(g)
+        test = tests[(A, B)]
+        if not res is None:
+          test.add(res if white_bot.name == A else 1 - res)
+        # Tests end only after both games of a round, so that A played as many games with each color
+        status = test.status() if counter % 2 == 1 else None
+        trajectory.write(dict(game = counter, A = A, B = B, wins = test.wins, losses = test.losses, llr = test.llr,
+                              lower = test.lower, upper = test.upper, status = status))
+        if not status is None:
+          concluded.add((A, B))
+          print("SPRT {} vs {}: {} accepted after {} games, {}".format(A, B, status, len(test.llrs), test))
+
+      # Every row of the game is written: a resumed run keeps them and goes on from the next game
+      schedule.done(counter, res, elapsed, file_sizes(outputs))
+      print()
+
+      if SAVE_EACH and counter % 2 == 1:
+        standings.to_csv(path_b)
+
+    standings.to_csv(path_b)
+    history.close()
+    games.close()
+    moves.close()
+    schedule.close()
+    if RECORDS:
+      records.close()
+    if TABLE_STATS:
+      table_stats.close()
+
+    # Time and work per move of each bot, over all the moves of the tournament
+    summary = summarize_moves(path_m)
+    if summary:
+      write_rows(os.path.join(BASE_PATH,"move_summary_{}_{}.csv".format(tourn, dt_string)), summary)
+      print("{:<30} {:>7} {:>10} {:>10} {:>12} {:>14}".format("bot", "moves", "wall/move", "cpu/move", "sims/move", "playouts/cpu s"))
+      for row in summary:
+        print("{:<30} {:>7} {:>10.3f} {:>10.3f} {:>12.1f} {:>14.1f}".format(row['bot'], row['moves'], row['wall_per_move'],
+                                                                          row['cpu_per_move'], row['simulations_per_move'], row['playouts_per_cpu_s']))
+
+    # Ratings fitted on all the games of the tournament
+    done = [g for g in schedule.games if g['status'] == 'done']
+    if done:
+      fit = BradleyTerry([g['white'] for g in done], [g['black'] for g in done], [g['score'] for g in done], names = names)
+      fit.to_csv(os.path.join(BASE_PATH,"ratings_{}_{}.csv".format(tourn, dt_string)))
+      print(fit)
+    if SPRT_MODE:
+      trajectory.close()
+      for (A, B), test in tests.items():
+        status = test.status()
+        print("SPRT {} vs {}: {}, {}".format(A, B, "no decision" if status is None else status + " accepted", test))
+
+    print(f"Tournament {tourn} is over (seed {schedule.info['seed']}). Results are available in {BASE_PATH}")
+
 
+if __name__ == "__main__":
+  main()
@@ -1,6 +1,35 @@
 # -*- coding: utf-8 -*-
 
+from array import array
+from contextlib import nullcontext
+from itertools import islice
+from multiprocessing import Lock, shared_memory
+import numpy as np
+import json
+import os
+import sys
+import time
+
+# Board hashes are a key in their low KEY_BITS bits, with check bits above them to verify that an entry is for the same position
+KEY_BITS = 64
+KEY_MASK = (1 << KEY_BITS) - 1
+# Move codes whose AMAF statistics a FixedTable slot keeps, and positions tried for a code from code % AMAF_PAIRS
+AMAF_PAIRS = 256
+AMAF_PROBES = 8
+
+class SparseStats(dict):
+    '''
+    AMAF statistics of a node, stored only for the move codes seen. Codes never seen read as 0
+    '''
+    __slots__ = ()
+
+    def __missing__(self, code):
+        return 0.0
+
 class T_Table(object):
+    '''
+    Entries are stored by the whole hash of their position, key and check bits, so two positions with the same key get separate entries
+    '''
     MaxLegalMoves = None
     MaxTotalLegalMoves = None
     White = None
@@ -14,33 +43,775 @@ class T_Table(object):
             raise Exception("Before creating a Transposition table, class variables 'MaxLegalMoves' and 'MaxTotalLegalMoves' must be set. Use game constants to define these values")
             
         self.Table = {}
+        # Simulations completed by the searches that used this table
+        self.simulations = 0
+        # Use counters of the searches, see stats
+        self.hits = 0
+        self.misses = 0
+        self.inserts = 0
     
     def look(self, board):
-        return self.Table.get(board.h, None)
+        t = self.Table.get(board.h, None)
+        if t is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return t
+
+    def _stored(self, board):
+        '''
+        Whether the table holds the position of board, without counting a lookup or reading another source of entries
+        '''
+        return board.h in self.Table
     
     def add(self, board):
-        nbplayouts = [0.0 for x in range(self.MaxLegalMoves)]
-        nwins = [0.0 for x in range(self.MaxLegalMoves)]
+        '''
+        Entry [visits, playouts per move, wins per move], with one slot for each legal move
+        '''
+        n = len(board.legalMoves())
+        nbplayouts = array('d', [0.0]) * n
+        nwins = array('d', [0.0]) * n
         self.Table[board.h] = [0, nbplayouts, nwins]
+        self.inserts += 1
     
     
     def addAMAF(self, board):
-        nbplayouts = [0.0 for x in range(self.MaxLegalMoves)]
-        nwins = [0.0 for x in range(self.MaxLegalMoves)]
-        nbplayoutsAMAF = [0.0 for x in range(self.MaxTotalLegalMoves)]
-        nwinsAMAF = [0.0 for x in range(self.MaxTotalLegalMoves)]
-        self.Table[board.h] = [1, nbplayouts, nwins, nbplayoutsAMAF, nwinsAMAF]
+        '''
+        Same as add, plus the AMAF playouts and wins indexed by move code
+        '''
+        n = len(board.legalMoves())
+        nbplayouts = array('d', [0.0]) * n
+        nwins = array('d', [0.0]) * n
+        self.Table[board.h] = [1, nbplayouts, nwins, SparseStats(), SparseStats()]
+        self.inserts += 1
+    
+    def nodes(self):
+        return len(self.Table)
+
+    def nbytes(self):
+        '''
+        Approximate memory used by the entries, measured on about 100 of them spread over the insertion order
+        '''
+        sample = list(islice(self.Table.values(), 0, None, max(len(self.Table) // 100, 1)))
+        if not sample:
+            return sys.getsizeof(self.Table)
+        size = 0
+        for t in sample:
+            size += sys.getsizeof(t) + sum(sys.getsizeof(x) for x in t)
+            for stats in t[3:]:
+                # float values, the int keys are shared with the other entries
+                size += len(stats) * sys.getsizeof(0.0)
+        return sys.getsizeof(self.Table) + size * len(self.Table) // len(sample)
+
+    def stats(self):
+        '''
+        Counters of the use of the table by the searches since it was created, its number of entries and their approximate size in bytes
+        '''
+        looks = self.hits + self.misses
+        return {'nodes': self.nodes(),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / looks if looks > 0 else 0.0,
+                'inserts': self.inserts,
+                'bytes': self.nbytes(),
+                'simulations': self.simulations}
+
+    def merge(self, t, other):
+        '''
+        Adds the statistics of entry other, for the same position, to entry t
+        '''
+        t[0] += other[0]
+        for k in (1, 2):
+            for i in range(len(t[k])):
+                t[k][i] += other[k][i]
+        for k in range(3, len(t)):
+            for code, value in other[k].items():
+                t[k][code] += value
     
+    def prune(self, board):
+        '''
+        Keeps only the entries reachable from the position of board, going down through the moves of the stored positions.
+        Used to keep a tree from one move to the next. board is played on and given back unchanged
+        '''
+        if not self._stored(board):
+            self._keep(set())
+            return
+        keep = {board.h}
+        stack = [[board.legalMoves(), 0]]
+        history = []
+        while stack:
+            moves, i = stack[-1]
+            if i == len(moves):
+                stack.pop()
+                if history:
+                    board.undo(*history.pop())
+                continue
+            stack[-1][1] += 1
+            info = board.play(moves[i])
+            if not board.h in keep and self._stored(board):
+                keep.add(board.h)
+                history += [(moves[i], info)]
+                stack += [[board.legalMoves(), 0]]
+            else:
+                board.undo(moves[i], info)
+        self._keep(keep)
+
+    def _keep(self, keys):
+        '''
+        Removes the entries whose key is not in keys
+        '''
+        self.Table = {h: self.Table[h] for h in keys}
+    
+    def descend(self, t, i, turn):
+        '''
+        Called when a search goes down move i of entry t, turn being the player to move, before the result is known.
+        Nothing to do for a table used by one search, see SharedTable
+        '''
+        pass
+
+    def update(self, t, i, res, turn):
+        '''
+        Adds the result res of a simulation that went down move i of entry t
+        '''
+        t[0] += 1
+        t[1][i] += 1
+        t[2][i] += res
+
+    def spec(self):
+        '''
+        Class and arguments of a new table like this one, built by the processes of a root parallel search, see play_functions.rootParallel
+        '''
+        return self.__class__, {}
+
+    def searched(self, board):
+        '''
+        Entry of board with the statistics of the searches that used this table, None if there is none
+        '''
+        return self.look(board)
+
+    def shared(self, capacity, amaf, nodes = None):
+        '''
+        Table searched by the processes of a tree parallel search, see play_functions.treeParallel.
+        Without capacity, it is sized by SharedTable.fit for a tree of nodes positions
+        '''
+        if capacity is None:
+            capacity = SharedTable.fit(amaf, nodes)
+        return SharedTable(capacity, amaf)
+
     '''
     This function can be called over an instance of the class, but is more like a class method for now
     '''
     def updateAMAF(self, t, played, res):
-        for i in range(len(played)):
-            code = played[i]
-            seen = False
-            for j in range(i):
-                if played[j] == code:
-                    seen = True
-            if not seen:
-                t[3][code] += 1
-                t[4][code] += res
\ No newline at end of file
+        # Each move counts once, even if it was played several times
+        for code in set(played):
+            t[3][code] += 1
+            t[4][code] += res
+
+
+def _amaf_probe(codes, code):
+    '''
+    Position of code among the AMAF codes of a FixedTable slot, or of the first free one (-1) of its probes. None if it has neither
+    '''
+    start = code % AMAF_PAIRS
+    for j in range(AMAF_PROBES):
+        k = (start + j) % AMAF_PAIRS
+        c = codes.item(k)
+        if c == code or c < 0:
+            return k
+    return None
+
+class SlotAMAF(object):
+    '''
+    AMAF playouts or wins of a FixedTable slot, read by move code like SparseStats. Codes not stored read as 0.
+    Values are float32 scalars, as read from the arrays of the slot
+    '''
+    __slots__ = ('codes', 'values')
+
+    def __init__(self, codes, values):
+        self.codes = codes
+        self.values = values
+
+    def __getitem__(self, code):
+        k = _amaf_probe(self.codes, code)
+        if k is None or self.codes.item(k) != code:
+            return self.values.dtype.type(0.0)
+        return self.values[k]
+
+class FixedEntry(object):
+    '''
+    Entry of a FixedTable slot with AMAF statistics, indexed like the entries of T_Table: [3] and [4] are the SlotAMAF of its playouts and wins
+    '''
+    __slots__ = ('slot', 'codes', 'amafPlayouts', 'amafWins')
+
+    def __init__(self, slot):
+        self.slot = slot
+        self.codes = slot['amafCodes']
+        self.amafPlayouts = SlotAMAF(self.codes, slot['amafPlayouts'])
+        self.amafWins = SlotAMAF(self.codes, slot['amafWins'])
+
+    def __getitem__(self, k):
+        if k == 3:
+            return self.amafPlayouts
+        if k == 4:
+            return self.amafWins
+        return self.slot[k]
+
+    def __setitem__(self, k, value):
+        self.slot[k] = value
+
+    def __reduce__(self):
+        return (FixedEntry, (self.slot,))
+
+
+class FixedTable(T_Table):
+    '''
+    Transposition table with a fixed number of slots, allocated once as a NumPy structured array.
+    A position goes in slot h % capacity or in its neighbour. When both hold other positions, the one with fewer visits is replaced.
+    A slot is pinned from descend to update, so the nodes on the path of a running simulation are never replaced:
+    a new position whose two slots are pinned is not stored.
+    Entries are views on the array, wrapped in a FixedEntry with AMAF statistics, indexed like the entries of T_Table: [visits, playouts, wins(, amafPlayouts, amafWins)].
+    Each slot keeps the key and the check bits of its position. A lookup whose key matches but check bits differ is a collision and misses
+    The AMAF statistics are allocated only if the first entry added uses them. A slot keeps them for at most AMAF_PAIRS move codes,
+    each one in the first free of AMAF_PROBES positions from code % AMAF_PAIRS, or else in place of the one with fewest playouts among them
+    '''
+    def __init__(self, capacity = 2**12):
+        super().__init__()
+        self.capacity = capacity + capacity % 2
+        self.slots = None
+        self.replaced = 0
+        self.dropped = 0
+        # Lookups that found another position with the same key
+        self.collisions = 0
+
+    @classmethod
+    def _fields(cls, amaf):
+        fields = [('visits', np.int64), ('playouts', np.float64, (cls.MaxLegalMoves,)), ('wins', np.float64, (cls.MaxLegalMoves,))]
+        if amaf:
+            fields += [('amafCodes', np.int16, (AMAF_PAIRS,)), ('amafPlayouts', np.float32, (AMAF_PAIRS,)), ('amafWins', np.float32, (AMAF_PAIRS,))]
+        fields += [('key', np.uint64), ('check', np.uint32), ('used', np.bool_), ('pins', np.int32)]
+        return np.dtype(fields)
+
+    def _allocate(self, amaf):
+        self._view(np.zeros(self.capacity, dtype = self._fields(amaf)), amaf)
+
+    def _view(self, slots, amaf):
+        self.slots = slots
+        self.empty = np.zeros((), dtype = slots.dtype)
+        if amaf:
+            self.empty['amafCodes'] = -1
+        self.amaf = amaf
+        self.keys, self.checks, self.used, self.visits = self.slots['key'], self.slots['check'], self.slots['used'], self.slots['visits']
+        self.pins = self.slots['pins']
+
+    def look(self, board):
+        if self.slots is None:
+            return None
+        key = board.h & KEY_MASK
+        i = key % self.capacity
+        for s in (i, i ^ 1):
+            if self.used[s] and self.keys[s] == key:
+                if self.checks[s] == board.h >> KEY_BITS:
+                    self.hits += 1
+                    return self._entry(s)
+                self.collisions += 1
+                break
+        self.misses += 1
+        return None
+
+    def _entry(self, s):
+        return FixedEntry(self.slots[s]) if self.amaf else self.slots[s]
+
+    def _stored(self, board):
+        if self.slots is None:
+            return False
+        key = board.h & KEY_MASK
+        i = key % self.capacity
+        return any(self.used[s] and self.keys[s] == key and self.checks[s] == board.h >> KEY_BITS for s in (i, i ^ 1))
+
+    def _slot(self, key):
+        '''
+        Slot for a new position with key, None if it would replace a pinned one.
+        A position with the same key is replaced in its slot, so that a key is never in both slots
+        '''
+        i = key % self.capacity
+        for s in (i, i ^ 1):
+            if self.used[s] and self.keys[s] == key:
+                if self.pins[s] != 0:
+                    return None
+                self.replaced += 1
+                return s
+        for s in (i, i ^ 1):
+            if not self.used[s]:
+                return s
+        free = [s for s in (i, i ^ 1) if self.pins[s] == 0]
+        if not free:
+            return None
+        self.replaced += 1
+        return min(free, key = lambda s: self.visits[s])
+
+    def _bucket(self, key):
+        '''
+        Lock of the two slots of key, see SharedTable
+        '''
+        return nullcontext()
+
+    def _index(self, t):
+        key = int(t['key'])
+        i = key % self.capacity
+        return i if self.used[i] and self.keys[i] == key else i ^ 1
+
+    def _insert(self, board, visits, amaf):
+        if self.slots is None:
+            self._allocate(amaf)
+        if amaf and not self.amaf:
+            raise Exception("This FixedTable was allocated without AMAF statistics")
+        key = board.h & KEY_MASK
+        with self._bucket(key):
+            # Already added, by another search of a shared table
+            if self._stored(board):
+                return
+            s = self._slot(key)
+            if s is None:
+                self.dropped += 1
+                return
+            self.slots[s] = self.empty
+            self.keys[s] = key
+            self.checks[s] = board.h >> KEY_BITS
+            self.used[s] = True
+            self.visits[s] = visits
+            self.inserts += 1
+
+    def add(self, board):
+        self._insert(board, 0, amaf = False)
+
+    def descend(self, t, i, turn):
+        self.pins[self._index(t)] += 1
+
+    def update(self, t, i, res, turn):
+        super().update(t, i, res, turn)
+        self.pins[self._index(t)] -= 1
+
+    def addAMAF(self, board):
+        self._insert(board, 1, amaf = True)
+
+    def _addAMAF(self, t, code, playouts, wins):
+        '''
+        Adds playouts and wins to the AMAF statistics of code in entry t
+        '''
+        codes = t.codes
+        k = _amaf_probe(codes, code)
+        if k is None:
+            probes = [(code + j) % AMAF_PAIRS for j in range(AMAF_PROBES)]
+            k = min(probes, key = lambda k: t.amafPlayouts.values.item(k))
+        if codes.item(k) != code:
+            codes[k] = code
+            t.amafPlayouts.values[k] = 0.0
+            t.amafWins.values[k] = 0.0
+        t.amafPlayouts.values[k] += playouts
+        t.amafWins.values[k] += wins
+
+    def updateAMAF(self, t, played, res):
+        for code in set(played):
+            self._addAMAF(t, code, 1, res)
+
+    def spec(self):
+        return self.__class__, {'capacity': self.capacity}
+
+    def nodes(self):
+        return 0 if self.slots is None else int(self.used.sum())
+
+    def nbytes(self):
+        return 0 if self.slots is None else self.slots.nbytes
+
+    def stats(self):
+        stats = super().stats()
+        stats['capacity'] = self.capacity
+        stats['collisions'] = self.collisions
+        stats['replaced'] = self.replaced
+        stats['dropped'] = self.dropped
+        return stats
+
+    def merge(self, t, other):
+        t[0] += other[0]
+        for k in (1, 2):
+            t[k] += other[k]
+        if self.amaf:
+            for k in np.flatnonzero(other.codes >= 0):
+                self._addAMAF(t, int(other.codes[k]), other.amafPlayouts.values[k], other.amafWins.values[k])
+
+    def _keep(self, keys):
+        if self.slots is None:
+            return
+        self.pins[:] = 0
+        for s in np.flatnonzero(self.used):
+            if not (int(self.checks[s]) << KEY_BITS | int(self.keys[s])) in keys:
+                self.used[s] = False
+
+
+# Locks of the SharedTable entries in this process, see SharedTable.share_locks
+_locks = None
+
+def shared_memory_free():
+    '''
+    Free bytes of the file system of the shared memory, None where there is no /dev/shm to measure
+    '''
+    try:
+        st = os.statvfs('/dev/shm')
+    except (AttributeError, OSError):
+        return None
+    return st.f_bavail * st.f_frsize
+
+def _attach(name):
+    try:
+        return shared_memory.SharedMemory(name = name, track = False)
+    except TypeError:
+        # Before Python 3.13 the memory is registered again, to the resource tracker the worker processes share with their parent
+        return shared_memory.SharedMemory(name = name)
+
+class SharedTable(FixedTable):
+    '''
+    FixedTable in shared memory, searched by several processes at once. Pickling it only sends the name of the memory,
+    the process that unpickles it works on the same slots.
+    Inserts and the statistics of an entry are changed under one of the locks given to the processes by share_locks, chosen by the two slots of its key,
+    so a pinned entry is never replaced. Lookups take no lock: a search may rarely read an entry while it is replaced.
+    A search going down a move counts it at once as a loss for the player to move (virtual loss), so that the searches
+    running at the same time spread over different lines, until update replaces the loss by the result.
+    AMAF statistics are allocated or not from the start, and take about 2.5 KB per slot.
+    The whole table must fit in the free shared memory, or writing its last slots would crash the processes.
+    Every process must call release when done with the table, the one that created it last
+    '''
+    # Part of the free shared memory a table sized by fit takes at most
+    SHARE = 0.5
+
+    def __init__(self, capacity = 2**14, amaf = True):
+        super().__init__(capacity)
+        size = self.capacity * self._fields(amaf).itemsize
+        free = shared_memory_free()
+        if not free is None and size > free:
+            raise Exception(f"A SharedTable of {self.capacity} slots needs {size >> 20} MB of shared memory, only {free >> 20} MB are free. Give it a smaller capacity")
+        self.owner = True
+        self.memory = shared_memory.SharedMemory(create = True, size = size)
+        self._allocate(amaf)
+
+    @classmethod
+    def fit(cls, amaf, nodes = None):
+        '''
+        Capacity for a tree of nodes positions, two slots each, or 2**14 slots if nodes is None,
+        reduced to fit in SHARE of the free shared memory
+        '''
+        capacity = 2**14 if nodes is None else 2 * nodes
+        free = shared_memory_free()
+        if not free is None:
+            capacity = min(capacity, int(free * cls.SHARE) // cls._fields(amaf).itemsize)
+        return max(capacity, 2)
+
+    def _allocate(self, amaf):
+        self._view(np.ndarray(self.capacity, dtype = self._fields(amaf), buffer = self.memory.buf), amaf)
+
+    def __getstate__(self):
+        return {'capacity': self.capacity, 'amaf': self.amaf, 'name': self.memory.name}
+
+    def __setstate__(self, state):
+        self.Table = {}
+        self.simulations = self.hits = self.misses = self.inserts = self.collisions = self.replaced = self.dropped = 0
+        self.capacity = state['capacity']
+        self.owner = False
+        self.memory = _attach(state['name'])
+        self._allocate(state['amaf'])
+
+    @staticmethod
+    def new_locks(stripes = 64):
+        return [Lock() for _ in range(stripes)]
+
+    @staticmethod
+    def share_locks(locks):
+        '''
+        Initializer of the processes searching SharedTables
+        '''
+        global _locks
+        _locks = locks
+
+    def _bucket(self, key):
+        if _locks is None:
+            return nullcontext()
+        return _locks[(key % self.capacity >> 1) % len(_locks)]
+
+    def _lock(self, t):
+        return self._bucket(int(t['key']))
+
+    def descend(self, t, i, turn):
+        with self._lock(t):
+            t[0] += 1
+            t[1][i] += 1
+            if turn == self.Black:
+                t[2][i] += 1
+            self.pins[self._index(t)] += 1
+
+    def update(self, t, i, res, turn):
+        with self._lock(t):
+            t[2][i] += res - 1 if turn == self.Black else res
+            self.pins[self._index(t)] -= 1
+
+    def updateAMAF(self, t, played, res):
+        with self._lock(t):
+            super().updateAMAF(t, played, res)
+
+    def shared(self, capacity, amaf, nodes = None):
+        return self
+
+    def release(self):
+        self.slots = self.empty = self.keys = self.checks = self.used = self.visits = self.pins = None
+        # Unlinked first: the memory is freed once closed, even if a view left by an error keeps it open for now
+        if self.owner:
+            self.memory.unlink()
+        try:
+            self.memory.close()
+        except BufferError:
+            # Entries still held, by the frames of an exception: the memory is closed when they are dropped
+            pass
+
+
+"""
+Tables saved on disk
+"""
+BOOK_MAGIC = b'ONITAMA TTABLE\n'
+BOOK_VERSION = 1
+# Arrays start at multiples of BOOK_ALIGN bytes in the file
+BOOK_ALIGN = 64
+
+def _aligned(n):
+    return -(-n // BOOK_ALIGN) * BOOK_ALIGN
+
+class Book(object):
+    '''
+    Read-only view of a table file written by write_book. Its arrays are memory mapped: opening the file reads only the header,
+    and a lookup reads the pages of the entries it goes through.
+    Entries are sorted by key. Those of entry i are visits[i], playouts and wins[move_start[i]:move_start[i + 1]],
+    amaf_codes, amaf_playouts and amaf_wins[amaf_start[i]:amaf_start[i + 1]]
+    '''
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            if f.read(len(BOOK_MAGIC)) != BOOK_MAGIC:
+                raise Exception(f"{path} is not a transposition table file")
+            size = int.from_bytes(f.read(8), 'little')
+            header = json.loads(f.read(size))
+        if header['version'] != BOOK_VERSION:
+            raise Exception(f"{path} has version {header['version']}, expected {BOOK_VERSION}")
+        self.path = path
+        start = _aligned(len(BOOK_MAGIC) + 8 + size)
+        for name, (dtype, length, offset) in header['arrays'].items():
+            if length == 0:
+                a = np.zeros(0, dtype = dtype)
+            else:
+                a = np.memmap(path, dtype = dtype, mode = 'r', offset = start + offset, shape = (length,))
+            setattr(self, name, a)
+
+    def __len__(self):
+        return len(self.key)
+
+    def find(self, h):
+        '''
+        Index of the entry of hash h, -1 if the file has none
+        '''
+        key = h & KEY_MASK
+        i = int(np.searchsorted(self.key, key))
+        while i < len(self.key) and self.key[i] == key:
+            if self.check[i] == h >> KEY_BITS:
+                return i
+            i += 1
+        return -1
+
+    def entry(self, i, weight = 1.0):
+        '''
+        Entry i as a T_Table entry with AMAF statistics, its statistics multiplied by weight
+        '''
+        a, b = self.move_start[i], self.move_start[i + 1]
+        playouts = array('d', (weight * self.playouts[a:b]).tobytes())
+        wins = array('d', (weight * self.wins[a:b]).tobytes())
+        a, b = self.amaf_start[i], self.amaf_start[i + 1]
+        codes = self.amaf_codes[a:b].tolist()
+        amafPlayouts = SparseStats(zip(codes, (weight * self.amaf_playouts[a:b]).tolist()))
+        amafWins = SparseStats(zip(codes, (weight * self.amaf_wins[a:b]).tolist()))
+        return [int(round(weight * self.visits[i])), playouts, wins, amafPlayouts, amafWins]
+
+    def entries(self):
+        for i in range(len(self)):
+            yield int(self.check[i]) << KEY_BITS | int(self.key[i]), self.entry(i)
+
+def open_book(path):
+    '''
+    Book of the file in path, None if there is no file
+    '''
+    if path is None or not os.path.exists(path):
+        return None
+    return Book(path)
+
+def write_book(path, entries):
+    '''
+    Writes the (hash, entry) pairs in path, for Book. The file is written next to path then renamed,
+    so that processes reading path see either the old or the new file
+    '''
+    entries = sorted(entries, key = lambda e: (e[0] & KEY_MASK, e[0] >> KEY_BITS))
+    codes = [sorted(t[3]) if len(t) > 3 else [] for h, t in entries]
+    arrays = {'key': np.array([h & KEY_MASK for h, t in entries], dtype = np.uint64),
+              'check': np.array([h >> KEY_BITS for h, t in entries], dtype = np.uint32),
+              'visits': np.array([t[0] for h, t in entries], dtype = np.int64),
+              'move_start': np.cumsum([0] + [len(t[1]) for h, t in entries], dtype = np.int64),
+              'playouts': np.array([x for h, t in entries for x in t[1]], dtype = np.float64),
+              'wins': np.array([x for h, t in entries for x in t[2]], dtype = np.float64),
+              'amaf_start': np.cumsum([0] + [len(c) for c in codes], dtype = np.int64),
+              'amaf_codes': np.array([c for cs in codes for c in cs], dtype = np.int32),
+              'amaf_playouts': np.array([t[3][c] for (h, t), cs in zip(entries, codes) for c in cs], dtype = np.float64),
+              'amaf_wins': np.array([t[4][c] for (h, t), cs in zip(entries, codes) for c in cs], dtype = np.float64)}
+    offset = 0
+    header = {'version': BOOK_VERSION, 'arrays': {}}
+    for name, a in arrays.items():
+        header['arrays'][name] = [a.dtype.str, len(a), offset]
+        offset = _aligned(offset + a.nbytes)
+    header = json.dumps(header).encode()
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, 'wb') as f:
+        f.write(BOOK_MAGIC + len(header).to_bytes(8, 'little') + header)
+        f.write(bytes(_aligned(f.tell()) - f.tell()))
+        for a in arrays.values():
+            f.write(a.tobytes())
+            f.write(bytes(_aligned(a.nbytes) - a.nbytes))
+    os.replace(tmp, path)
+
+class FileLock(object):
+    '''
+    Lock shared by processes through the creation of the file path + '.lock'
+    '''
+    def __init__(self, path, timeout = 60):
+        self.path = path + '.lock'
+        self.timeout = timeout
+
+    def __enter__(self):
+        start = time.time()
+        while True:
+            try:
+                os.close(os.open(self.path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+                return self
+            except FileExistsError:
+                if time.time() - start > self.timeout:
+                    raise Exception(f"Could not lock {self.path} in {self.timeout} s. Remove it if no process is writing the table")
+                time.sleep(0.05)
+
+    def __exit__(self, *exc):
+        os.remove(self.path)
+
+class PersistentTable(T_Table):
+    '''
+    T_Table whose entries start from the statistics of a file, used as priors, and that adds what its searches learnt to the file with flush.
+    The file is memory mapped read-only, so opening it costs nothing and any number of processes can read it.
+    A position missing from the table is looked for in the file and its entry, with its statistics multiplied by weight, is added to the table.
+    Entries from the file always have AMAF statistics, so the same file serves all the bots.
+    Hashes depend on the order of the cards of the board: a file is meant for one card draw.
+    Without path, or if the file does not exist yet, it starts as an empty T_Table
+    '''
+    def __init__(self, path = None, weight = 1.0, min_visits = 10):
+        super().__init__()
+        self.path = path
+        self.weight = weight
+        # Entries with fewer visits are not written in the file
+        self.min_visits = min_visits
+        self.book = open_book(path)
+        # Statistics learnt by the entries dropped since the last flush, by hash
+        self.pending = {}
+        # Entries read from the file
+        self.priors = 0
+
+    def _prior(self, h, n):
+        if self.book is None:
+            return None
+        i = self.book.find(h)
+        if i < 0 or self.book.move_start[i + 1] - self.book.move_start[i] != n:
+            return None
+        return self.book.entry(i, self.weight)
+
+    def look(self, board):
+        t = self.Table.get(board.h, None)
+        if t is None:
+            t = self._prior(board.h, len(board.legalMoves()))
+            if not t is None:
+                self.Table[board.h] = t
+                self.priors += 1
+        if t is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return t
+
+    def stats(self):
+        stats = super().stats()
+        stats['priors'] = self.priors
+        return stats
+
+    def spec(self):
+        return self.__class__, {'path': self.path, 'weight': self.weight, 'min_visits': self.min_visits}
+
+    def searched(self, board):
+        '''
+        Entry of board without its prior, so that the root entries of a root parallel search add the file's statistics only once
+        '''
+        t = self.look(board)
+        return None if t is None else self._learnt(board.h, t)
+
+    def _learnt(self, h, t):
+        '''
+        Statistics of entry t minus its prior
+        '''
+        d = [t[0], array('d', t[1]), array('d', t[2]), SparseStats(), SparseStats()]
+        for k in range(3, len(t)):
+            d[k].update(t[k])
+        prior = self._prior(h, len(t[1]))
+        if not prior is None:
+            d[0] -= prior[0]
+            for k in (1, 2):
+                for i in range(len(d[k])):
+                    d[k][i] -= prior[k][i]
+            for k in (3, 4):
+                for code, value in prior[k].items():
+                    d[k][code] -= value
+        return d
+
+    def _keep(self, keys):
+        '''
+        Keeps what the dropped entries learnt for the next flush
+        '''
+        for h, t in self.Table.items():
+            if not h in keys and t[0] >= self.min_visits:
+                d = self._learnt(h, t)
+                if h in self.pending:
+                    self.merge(self.pending[h], d)
+                else:
+                    self.pending[h] = d
+        super()._keep(keys)
+
+    def clear(self):
+        '''
+        Empties the table, as a new table would be, without losing what it learnt
+        '''
+        self._keep(set())
+
+    def flush(self):
+        '''
+        Adds the statistics learnt since the last flush to the file, after the ones other processes may have added.
+        The table is emptied and its priors now come from the new file
+        '''
+        self.clear()
+        if self.path is None or not self.pending:
+            return
+        with FileLock(self.path):
+            book = open_book(self.path)
+            entries = {} if book is None else dict(book.entries())
+            for h, d in self.pending.items():
+                t = entries.get(h, None)
+                if t is None or len(t[1]) != len(d[1]):
+                    entries[h] = d
+                else:
+                    self.merge(t, d)
+            write_book(self.path, entries.items())
+        self.pending = {}
+        self.book = open_book(self.path)
+